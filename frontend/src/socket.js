@@ -1,18 +1,114 @@
 import { io } from "socket.io-client"
 import { socketio_port } from "../../../../sites/common_site_config.json"
 
+// Must match lodgeick.services.realtime
+export const INTEGRATION_EVENT = "lodgeick_integration_update"
+export const CONNECTION_EVENT = "lodgeick_oauth_connection"
+
+// Rapid updates for the same integration (e.g. a webhook callback that
+// changes status and logs an execution) are merged into one notification
+const COALESCE_MS = 250
+
 let socket = null
+
+// integration id -> Set of callbacks; "*" receives every integration
+const subscribers = new Map()
+const pending = new Map()
+
 export function initSocket() {
-	// Disable socket.io for development
-	// TODO: Configure proper socketio_port when needed
-	socket = {
-		on: () => {},
-		emit: () => {},
-		off: () => {},
-	}
+	const host = window.location.hostname
+	const siteName = window.site_name
+	const port = window.location.port ? `:${socketio_port}` : ""
+	const protocol = port ? "http" : "https"
+	const url = `${protocol}://${host}${port}/${siteName}`
+
+	socket = io(url, {
+		withCredentials: true,
+		reconnectionAttempts: 5,
+	})
+	socket.on(INTEGRATION_EVENT, queueIntegrationUpdate)
 	return socket
 }
 
 export function useSocket() {
 	return socket
 }
+
+/**
+ * Subscribe to realtime updates for one integration
+ * Pass "*" to receive updates for all of the user's integrations.
+ * Returns an unsubscribe function.
+ */
+export function subscribeToIntegration(integrationId, callback) {
+	if (!subscribers.has(integrationId)) {
+		subscribers.set(integrationId, new Set())
+	}
+	subscribers.get(integrationId).add(callback)
+
+	return () => {
+		const callbacks = subscribers.get(integrationId)
+		if (!callbacks) return
+		callbacks.delete(callback)
+		if (callbacks.size === 0) {
+			subscribers.delete(integrationId)
+		}
+	}
+}
+
+/**
+ * Follow the background setup that runs after an OAuth connection
+ * Stages: connected -> settings -> n8n -> done | error.
+ * Returns an unsubscribe function.
+ */
+export function subscribeToConnectionProgress(provider, callback) {
+	if (!socket) return () => {}
+
+	const handler = (message) => {
+		if (message?.provider === provider) {
+			callback(message)
+		}
+	}
+	socket.on(CONNECTION_EVENT, handler)
+	return () => socket.off(CONNECTION_EVENT, handler)
+}
+
+function queueIntegrationUpdate(message) {
+	const id = message?.integration_id
+	if (!id) return
+	if (!subscribers.has(id) && !subscribers.has("*")) return
+
+	const entry = pending.get(id)
+	if (entry) {
+		// Later fields win, but keep every execution seen in the window
+		if (message.execution) {
+			entry.executions.push(message.execution)
+		}
+		Object.assign(entry.message, message)
+		return
+	}
+
+	pending.set(id, {
+		message: { ...message },
+		executions: message.execution ? [message.execution] : [],
+	})
+	setTimeout(() => flushIntegrationUpdate(id), COALESCE_MS)
+}
+
+function flushIntegrationUpdate(id) {
+	const entry = pending.get(id)
+	pending.delete(id)
+	if (!entry) return
+
+	const update = { ...entry.message, executions: entry.executions }
+	delete update.execution
+
+	for (const key of [id, "*"]) {
+		for (const callback of subscribers.get(key) || []) {
+			try {
+				callback(update)
+			} catch (error) {
+				console.error("Integration update handler failed:", error)
+			}
+		}
+	}
+}
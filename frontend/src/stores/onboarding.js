@@ -40,7 +40,7 @@ export const useOnboardingStore = defineStore('onboarding', () => {
 
     isLoadingApps.value = true
     try {
-      const response = await call('lodgeick.api.catalog.get_app_catalog')
+      const response = await fetchCatalog()
 
       if (response.success && response.apps) {
         availableApps.value = response.apps.map(app => ({
@@ -63,6 +63,20 @@ export const useOnboardingStore = defineStore('onboarding', () => {
     }
   }
 
+  // Prefer the prebuilt static snapshot; fall back to the API if it is
+  // missing or unreachable
+  async function fetchCatalog() {
+    if (window.catalog_snapshot) {
+      try {
+        const snapshot = await fetch(window.catalog_snapshot)
+        if (snapshot.ok) return await snapshot.json()
+      } catch (error) {
+        console.warn('Catalog snapshot unavailable, using API:', error)
+      }
+    }
+    return call('lodgeick.api.catalog.get_app_catalog')
+  }
+
   function getAppIcon(appName) {
     const icons = {
       'jira': '🎯',
@@ -6,18 +6,51 @@ Provides catalog of available apps and use cases
 import frappe
 from frappe import _
 
+from lodgeick.services.catalog_cache import cached_response, get_category_counts
+
+
+APP_FIELDS = [
+	"name",
+	"app_name",
+	"display_name",
+	"logo_url",
+	"description",
+	"category",
+	"oauth_provider"
+]
+
+USE_CASE_FIELDS = ["use_case_name", "description", "workflow_template_id"]
+
 
 @frappe.whitelist(allow_guest=True)
 def get_app_catalog(category=None):
 	"""
 	Get list of available apps
 
+	Responses are cached per catalog version and carry an ETag.
+
 	Args:
 		category: Optional category filter
 
 	Returns:
 		dict: List of apps with their use cases
 	"""
+	category = category or None
+	if category and category not in get_category_options():
+		# Not worth a query, nor a cache entry per made-up category
+		return {"success": True, "apps": []}
+
+	return cached_response("get_app_catalog", {"category": category}, lambda: get_app_catalog_data(category))
+
+
+def get_category_options():
+	"""Categories allowed by the App Catalog category field"""
+	options = frappe.get_meta("App Catalog").get_field("category").options or ""
+	return [option for option in options.split("\n") if option]
+
+
+def get_app_catalog_data(category=None):
+	"""Build the get_app_catalog response from the database"""
 	filters = {"is_active": 1}
 
 	if category:
@@ -26,27 +59,11 @@ def get_app_catalog(category=None):
 	apps = frappe.get_all(
 		"App Catalog",
 		filters=filters,
-		fields=[
-			"name",
-			"app_name",
-			"display_name",
-			"logo_url",
-			"description",
-			"category",
-			"oauth_provider"
-		],
+		fields=APP_FIELDS,
 		order_by="display_name asc"
 	)
 
-	# Get use cases for each app
-	for app in apps:
-		use_cases = frappe.get_all(
-			"App Use Case",
-			filters={"parent": app.name},
-			fields=["use_case_name", "description", "workflow_template_id"],
-			order_by="idx asc"
-		)
-		app["use_cases"] = use_cases
+	attach_use_cases(apps)
 
 	return {
 		"success": True,
@@ -59,12 +76,19 @@ def get_app_details(app_name):
 	"""
 	Get detailed information about an app
 
+	Responses are cached per catalog version and carry an ETag.
+
 	Args:
 		app_name: App name
 
 	Returns:
 		dict: App details with use cases
 	"""
+	return cached_response("get_app_details", {"app_name": app_name}, lambda: get_app_details_data(app_name))
+
+
+def get_app_details_data(app_name):
+	"""Build the get_app_details response from the database"""
 	try:
 		app = frappe.get_doc("App Catalog", app_name)
 
@@ -100,35 +124,29 @@ def get_categories():
 	"""
 	Get list of app categories
 
+	Responses are cached per catalog version and carry an ETag.
+
 	Returns:
 		dict: List of categories with app counts
 	"""
-	categories = frappe.get_all(
-		"App Catalog",
-		filters={"is_active": 1},
-		fields=["category"],
-		group_by="category"
-	)
+	return cached_response("get_categories", {}, get_categories_data)
 
-	category_counts = {}
-	for cat in categories:
-		if cat.category:
-			count = frappe.db.count("App Catalog", {
-				"category": cat.category,
-				"is_active": 1
-			})
-			category_counts[cat.category] = count
 
+def get_categories_data():
+	"""Build the get_categories response from the maintained category counts"""
 	return {
 		"success": True,
-		"categories": category_counts
+		"categories": get_category_counts()
 	}
 
 
 @frappe.whitelist()
 def search_apps(query):
 	"""
-	Search for apps by name or description
+	Search for apps by name, description, category or use case
+
+	Results are ranked by relevance; the last word matches as a prefix and
+	single typos are tolerated.
 
 	Args:
 		query: Search query
@@ -137,42 +155,41 @@ def search_apps(query):
 		dict: Matching apps
 	"""
 	if not query:
-		return get_app_catalog()
+		return get_app_catalog_data()
 
-	apps = frappe.get_all(
-		"App Catalog",
-		filters={
-			"is_active": 1
-		},
-		or_filters=[
-			["display_name", "like", f"%{query}%"],
-			["description", "like", f"%{query}%"],
-			["app_name", "like", f"%{query}%"]
-		],
-		fields=[
-			"name",
-			"app_name",
-			"display_name",
-			"logo_url",
-			"description",
-			"category",
-			"oauth_provider"
-		],
-		order_by="display_name asc"
-	)
-
-	# Get use cases for each app
-	for app in apps:
-		use_cases = frappe.get_all(
-			"App Use Case",
-			filters={"parent": app.name},
-			fields=["use_case_name", "description", "workflow_template_id"],
-			order_by="idx asc"
-		)
-		app["use_cases"] = use_cases
+	from lodgeick.services import catalog_search
 
 	return {
 		"success": True,
-		"apps": apps,
+		"apps": catalog_search.search(query),
 		"query": query
 	}
+
+
+def attach_use_cases(apps):
+	"""
+	Add each app's use cases (in idx order) under "use_cases"
+
+	Loads the use cases of all apps in one query instead of one per app.
+
+	Args:
+		apps: App Catalog rows with a name field; modified in place
+	"""
+	if not apps:
+		return apps
+
+	use_cases = frappe.get_all(
+		"App Use Case",
+		filters={"parent": ["in", [app.name for app in apps]], "parenttype": "App Catalog"},
+		fields=["parent"] + USE_CASE_FIELDS,
+		order_by="parent asc, idx asc"
+	)
+
+	by_app = {}
+	for use_case in use_cases:
+		by_app.setdefault(use_case.pop("parent"), []).append(use_case)
+
+	for app in apps:
+		app["use_cases"] = by_app.get(app.name, [])
+
+	return apps
@@ -130,33 +130,37 @@ def get_integration_status(integration_id):
 
 
 @frappe.whitelist()
-def list_user_integrations():
+def list_user_integrations(fields=None, status=None, app=None, cursor=None, page_length=None, with_total=False):
 	"""
-	List all integrations for current user
+	List integrations for current user, newest first
+
+	Args:
+		fields: Field set name ('minimal', 'summary', 'detail') or list of columns
+		status: Optional status filter
+		app: Optional app filter (matches source or target app)
+		cursor: Cursor from the previous page's next_cursor; without a cursor or
+			page_length all integrations are returned
+		page_length: Page size (max 500; default 50 when paging with a cursor)
+		with_total: Include total count for the filters
 
 	Returns:
-		dict: List of integrations
+		dict: Integrations (one page if paginated) with next_cursor/has_more
 	"""
-	user = frappe.session.user
-
-	integrations = frappe.get_all(
-		"User Integration",
-		filters={"user": user},
-		fields=[
-			"name",
-			"flow_name",
-			"source_app",
-			"target_app",
-			"status",
-			"last_run",
-			"modified"
-		],
-		order_by="modified desc"
+	from lodgeick.services.integration_query import list_integrations_page
+
+	page = list_integrations_page(
+		frappe.session.user,
+		fields=fields,
+		status=status,
+		app=app,
+		cursor=cursor,
+		page_length=page_length,
+		with_total=with_total
 	)
 
 	return {
 		"success": True,
-		"integrations": integrations
+		**page
 	}
 
 
@@ -230,31 +234,15 @@ def delete_integration(integration_id):
 # Helper functions
 
 def get_user_token(user, provider):
-	"""Get user's OAuth token for a provider"""
-	try:
-		token = frappe.get_doc("Integration Token", {
-			"user": user,
-			"provider": provider
-		})
-		return token
-	except frappe.DoesNotExistError:
-		return None
+	"""Get user's OAuth token for a provider (cached, see services.token_store)"""
+	from lodgeick.services.token_store import get_token
+	return get_token(user, provider)
 
 
 def get_workflow_template(flow_name, source_app, target_app):
-	"""Get workflow template ID from App Catalog"""
-	# Get source app
-	try:
-		app_catalog = frappe.get_doc("App Catalog", source_app)
-
-		# Find matching use case
-		for use_case in app_catalog.use_cases:
-			if use_case.use_case_name == flow_name:
-				return use_case.workflow_template_id
-
-		return None
-	except frappe.DoesNotExistError:
-		return None
+	"""Get workflow template ID from App Catalog (cached, see services.workflow_templates)"""
+	from lodgeick.services.workflow_templates import resolve_workflow_template
+	return resolve_workflow_template(source_app, flow_name)
 
 
 def create_n8n_workflow(template_id, source_token, target_token, config):
@@ -351,6 +339,16 @@ def n8n_webhook_callback():
 		execution_time
 	)
 
+	from lodgeick.services.realtime import publish_integration_update
+	publish_integration_update(integration, "execution", {
+		"execution": {
+			"status": log_status,
+			"message": message,
+			"execution_time": execution_time,
+			"timestamp": frappe.utils.now()
+		}
+	})
+
 	return {
 		"success": True,
 		"message": "Callback processed successfully"
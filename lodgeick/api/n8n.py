@@ -296,31 +296,39 @@ def trigger_sync_job():
 
 
 @frappe.whitelist()
-def list_user_integrations(status=None):
+def list_user_integrations(status=None, fields=None, app=None, cursor=None, page_length=None, with_total=False):
 	"""
-	List all integrations for current user
+	List integrations for current user, newest first
 
 	Args:
 		status: Optional status filter
+		fields: Field set name ('minimal', 'summary', 'detail') or list of columns
+		app: Optional app filter (matches source or target app)
+		cursor: Cursor from the previous page's next_cursor; without a cursor or
+			page_length all integrations are returned
+		page_length: Page size (max 500; default 50 when paging with a cursor)
+		with_total: Include total count for the filters
 
 	Returns:
-		List of integrations
+		Integrations (one page if paginated) with next_cursor/has_more
 	"""
 	try:
-		filters = {"user": frappe.session.user}
-		if status:
-			filters["status"] = status
-
-		integrations = frappe.get_all(
-			"User Integration",
-			fields=["name", "flow_name", "source_app", "target_app", "status", "workflow_id", "last_run"],
-			filters=filters,
-			order_by="modified desc"
+		from lodgeick.services.integration_query import list_integrations_page
+
+		page = list_integrations_page(
+			frappe.session.user,
+			fields=fields,
+			status=status,
+			app=app,
+			cursor=cursor,
+			page_length=page_length,
+			with_total=with_total,
+			default_set="detail"
 		)
 
 		return {
 			"success": True,
-			"integrations": integrations
+			**page
 		}
 
 	except Exception as e:
@@ -5,11 +5,18 @@ Handles OAuth flows for various providers
 
 import frappe
 from frappe import _
-import requests
 import json
+import math
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 
+OAUTH_SETTINGS = "OAuth Credentials Settings"
+
+# Seconds a refresh lock outlives the worst-case token request
+TOKEN_REFRESH_LOCK_MARGIN = 10
+
+
 @frappe.whitelist(allow_guest=True)
 def initiate_oauth(provider, redirect_uri=None):
 	"""
@@ -80,52 +87,24 @@ def oauth_callback(code, state, provider):
 	provider_config = get_provider_config(provider)
 	tokens = exchange_code_for_tokens(provider_config, code, state_data.get("redirect_uri"))
 
-	# Store tokens in Integration Token doctype
-	token_doc = frappe.get_doc({
-		"doctype": "Integration Token",
-		"user": state_data.get("user"),
-		"provider": provider,
-		"access_token": tokens.get("access_token"),
-		"refresh_token": tokens.get("refresh_token"),
-		"expires_at": calculate_expiry(tokens.get("expires_in")),
-		"token_data": json.dumps(tokens)
-	})
-	token_doc.insert(ignore_permissions=True)
-
-	# Create or update User Integration Settings
-	try:
-		# Find the app that uses this provider
-		app = frappe.db.get_value("App Catalog", {"oauth_provider": provider}, "name")
-
-		if app:
-			# Check if settings already exist
-			existing_settings = frappe.db.get_value(
-				"User Integration Settings",
-				{"user": state_data.get("user"), "app_name": app},
-				"name"
-			)
-
-			if existing_settings:
-				# Update existing
-				settings_doc = frappe.get_doc("User Integration Settings", existing_settings)
-				settings_doc.is_active = 1
-				settings_doc.save(ignore_permissions=True)
-			else:
-				# Create new
-				settings_doc = frappe.get_doc({
-					"doctype": "User Integration Settings",
-					"user": state_data.get("user"),
-					"app_name": app,
-					"is_active": 1,
-					"settings": json.dumps({
-						"connected_at": datetime.now().isoformat(),
-						"provider": provider
-					})
-				})
-				settings_doc.insert(ignore_permissions=True)
-	except Exception as e:
-		# Don't fail the OAuth flow if settings creation fails
-		frappe.log_error(f"Failed to create User Integration Settings: {str(e)}")
+	# Store tokens in Integration Token doctype (one row per user/provider)
+	from lodgeick.lodgeick.doctype.integration_token.integration_token import IntegrationToken
+	IntegrationToken.upsert(
+		state_data.get("user"),
+		provider,
+		access_token=tokens.get("access_token"),
+		refresh_token=tokens.get("refresh_token"),
+		expires_at=calculate_expiry(tokens.get("expires_in")),
+		token_data=json.dumps(tokens)
+	)
+
+	# Settings, n8n credential sync and cache warming run in the background;
+	# progress is pushed to the user over realtime
+	from lodgeick.services.realtime import publish_connection_progress
+	from lodgeick.tasks.oauth_post_connect import enqueue_post_connect
+
+	enqueue_post_connect(state_data.get("user"), provider)
+	publish_connection_progress(state_data.get("user"), provider, "connected")
 
 	frappe.db.commit()
 
@@ -147,76 +126,10 @@ def get_provider_config(provider):
 		provider: Provider name
 
 	Returns:
-		dict: Provider configuration
+		dict: Provider configuration (read-only)
 	"""
-	# Try to get from OAuth Credentials Settings first
-	try:
-		settings = frappe.get_single("OAuth Credentials Settings")
-		provider_settings = None
-
-		for cred in settings.oauth_credentials:
-			if cred.provider == provider:
-				provider_settings = cred
-				break
-
-		if provider_settings and provider_settings.client_id and provider_settings.client_secret:
-			# Provider-specific configurations
-			provider_configs = {
-				"xero": {
-					"auth_url": "https://login.xero.com/identity/connect/authorize",
-					"token_url": "https://identity.xero.com/connect/token",
-					"scope": "accounting.transactions accounting.contacts offline_access"
-				},
-				"google": {
-					"auth_url": "https://accounts.google.com/o/oauth2/v2/auth",
-					"token_url": "https://oauth2.googleapis.com/token",
-					"scope": "https://www.googleapis.com/auth/gmail.readonly https://www.googleapis.com/auth/gmail.send https://www.googleapis.com/auth/spreadsheets https://www.googleapis.com/auth/drive.file"
-				},
-				"slack": {
-					"auth_url": "https://slack.com/oauth/v2/authorize",
-					"token_url": "https://slack.com/api/oauth.v2.access",
-					"scope": "channels:read channels:write chat:write"
-				},
-				"hubspot": {
-					"auth_url": "https://app.hubspot.com/oauth/authorize",
-					"token_url": "https://api.hubapi.com/oauth/v1/token",
-					"scope": "crm.objects.contacts.read crm.objects.contacts.write"
-				}
-			}
-
-			config = provider_configs.get(provider, {})
-			config["client_id"] = provider_settings.client_id
-			config["client_secret"] = provider_settings.client_secret
-			return config
-	except Exception as e:
-		frappe.log_error(f"Error getting provider config from settings: {str(e)}")
-
-	# Fallback to frappe.conf
-	configs = {
-		"xero": {
-			"client_id": frappe.conf.get("xero_client_id"),
-			"client_secret": frappe.conf.get("xero_client_secret"),
-			"auth_url": "https://login.xero.com/identity/connect/authorize",
-			"token_url": "https://identity.xero.com/connect/token",
-			"scope": "accounting.transactions accounting.contacts offline_access"
-		},
-		"google": {
-			"client_id": frappe.conf.get("google_client_id"),
-			"client_secret": frappe.conf.get("google_client_secret"),
-			"auth_url": "https://accounts.google.com/o/oauth2/v2/auth",
-			"token_url": "https://oauth2.googleapis.com/token",
-			"scope": "https://www.googleapis.com/auth/gmail.readonly https://www.googleapis.com/auth/gmail.send https://www.googleapis.com/auth/spreadsheets https://www.googleapis.com/auth/drive.file"
-		},
-		"slack": {
-			"client_id": frappe.conf.get("slack_client_id"),
-			"client_secret": frappe.conf.get("slack_client_secret"),
-			"auth_url": "https://slack.com/oauth/v2/authorize",
-			"token_url": "https://slack.com/api/oauth.v2.access",
-			"scope": "channels:read channels:write chat:write"
-		}
-	}
-
-	return configs.get(provider)
+	from lodgeick.services.provider_config import get_provider_config as resolve_provider_config
+	return resolve_provider_config(provider)
 
 
 @frappe.whitelist()
@@ -261,6 +174,179 @@ def save_oauth_credentials(credentials):
 	}
 
 
+@frappe.whitelist()
+def get_oauth_credentials():
+	"""
+	List configured OAuth credentials (without secrets)
+
+	Returns:
+		dict: Credentials with provider, client_id and modified (pass
+		modified back as expected_modified when updating)
+	"""
+	frappe.has_permission("OAuth Credentials Settings", "read", throw=True)
+
+	credentials = frappe.get_all(
+		"OAuth Credential",
+		filters={"parent": OAUTH_SETTINGS, "parenttype": OAUTH_SETTINGS},
+		fields=["provider", "client_id", "modified"],
+		order_by="idx asc"
+	)
+
+	return {
+		"success": True,
+		"credentials": credentials
+	}
+
+
+@frappe.whitelist()
+def upsert_oauth_credential(provider, client_id, client_secret, expected_modified=None):
+	"""
+	Create or update the credentials of a single provider
+
+	Args:
+		provider: Provider name
+		client_id: OAuth client ID
+		client_secret: OAuth client secret
+		expected_modified: modified value the caller last read; the save is
+			rejected if the row changed since
+
+	Returns:
+		dict: Success status and the row's new modified value
+	"""
+	frappe.has_permission("OAuth Credentials Settings", "write", throw=True)
+	return _upsert_oauth_credential(provider, client_id, client_secret, expected_modified)
+
+
+@frappe.whitelist()
+def delete_oauth_credential(provider, expected_modified=None):
+	"""
+	Remove the credentials of a single provider
+
+	Args:
+		provider: Provider name
+		expected_modified: modified value the caller last read
+
+	Returns:
+		dict: Success status
+	"""
+	frappe.has_permission("OAuth Credentials Settings", "write", throw=True)
+
+	with _credential_lock(provider):
+		row = _get_credential_row(provider, expected_modified)
+		if row:
+			from frappe.utils.password import delete_all_passwords_for
+			frappe.db.delete("OAuth Credential", {"name": row.name})
+			delete_all_passwords_for("OAuth Credential", row.name)
+			frappe.clear_document_cache(OAUTH_SETTINGS, OAUTH_SETTINGS)
+			frappe.db.commit()
+
+	from lodgeick.services.provider_config import invalidate_provider_config
+	invalidate_provider_config(provider)
+
+	return {
+		"success": True,
+		"message": f"OAuth credentials for {provider} removed"
+	}
+
+
+def _upsert_oauth_credential(provider, client_id, client_secret, expected_modified=None):
+	"""Write one provider's row in OAuth Credentials Settings without touching the others"""
+	from frappe.utils.password import set_encrypted_password
+
+	if not provider or not client_id or not client_secret:
+		frappe.throw(_("Provider, Client ID and Client Secret are required"))
+
+	now = frappe.utils.now()
+
+	with _credential_lock(provider):
+		row = _get_credential_row(provider, expected_modified)
+
+		if row:
+			name = row.name
+			frappe.db.set_value(
+				"OAuth Credential",
+				name,
+				{"client_id": client_id, "client_secret": "*" * len(client_secret)},
+				modified=now
+			)
+		else:
+			if expected_modified:
+				frappe.throw(_("OAuth credentials for {0} were removed by someone else").format(provider), frappe.TimestampMismatchError)
+
+			from frappe.query_builder.functions import Max
+			OAuthCredential = frappe.qb.DocType("OAuth Credential")
+			idx = (
+				frappe.qb.from_(OAuthCredential)
+				.select(Max(OAuthCredential.idx))
+				.where(OAuthCredential.parent == OAUTH_SETTINGS)
+			).run()[0][0] or 0
+			credential = frappe.get_doc({
+				"doctype": "OAuth Credential",
+				"parent": OAUTH_SETTINGS,
+				"parenttype": OAUTH_SETTINGS,
+				"parentfield": "oauth_credentials",
+				"idx": idx + 1,
+				"provider": provider,
+				"client_id": client_id,
+				"client_secret": "*" * len(client_secret)
+			})
+			credential.creation = credential.modified = now
+			credential.owner = credential.modified_by = frappe.session.user
+			credential.db_insert()
+			name = credential.name
+
+		set_encrypted_password("OAuth Credential", name, client_secret, "client_secret")
+		frappe.clear_document_cache(OAUTH_SETTINGS, OAUTH_SETTINGS)
+		frappe.db.commit()
+
+	from lodgeick.services.provider_config import invalidate_provider_config
+	invalidate_provider_config(provider)
+
+	return {
+		"success": True,
+		"message": f"OAuth credentials for {provider} saved successfully",
+		"modified": now
+	}
+
+
+def _get_credential_row(provider, expected_modified=None):
+	"""Load a provider's credential row, enforcing the caller's expected_modified"""
+	row = frappe.db.get_value(
+		"OAuth Credential",
+		{"parent": OAUTH_SETTINGS, "parenttype": OAUTH_SETTINGS, "provider": provider},
+		["name", "modified"],
+		as_dict=True,
+		for_update=True
+	)
+
+	if row and expected_modified and frappe.utils.get_datetime(expected_modified) != frappe.utils.get_datetime(row.modified):
+		frappe.throw(
+			_("OAuth credentials for {0} were changed by someone else. Please reload and try again.").format(provider),
+			frappe.TimestampMismatchError
+		)
+
+	return row
+
+
+@contextmanager
+def _credential_lock(provider, ttl=30):
+	"""Serialise writers of one provider's credentials across workers"""
+	from lodgeick.services.single_flight import acquire_lock, release_lock
+
+	key = f"oauth_credential:{provider}"
+	token = acquire_lock(key, ttl)
+	if not token:
+		frappe.throw(
+			_("OAuth credentials for {0} are being saved by someone else. Please try again.").format(provider),
+			frappe.TimestampMismatchError
+		)
+
+	try:
+		yield
+	finally:
+		release_lock(key, token)
+
+
 def build_auth_url(config, state, redirect_uri=None):
 	"""Build OAuth authorization URL"""
 	if not redirect_uri:
@@ -293,7 +379,8 @@ def exchange_code_for_tokens(config, code, redirect_uri):
 		"redirect_uri": redirect_uri
 	}
 
-	response = requests.post(config["token_url"], data=data)
+	from lodgeick.services.provider_http import token_request
+	response = token_request(config.get("provider"), config["token_url"], data)
 
 	if response.status_code != 200:
 		frappe.throw(_("Failed to exchange code for tokens: {0}").format(response.text))
@@ -353,12 +440,8 @@ def save_user_oauth_setup(provider, tier='manual', client_id=None, client_secret
 		if not client_id or not client_secret:
 			frappe.throw(_("Client ID and Client Secret are required for manual setup"))
 
-		# Save to OAuth Credentials Settings (user-specific)
-		save_oauth_credentials([{
-			"provider": provider,
-			"client_id": client_id,
-			"client_secret": client_secret
-		}])
+		# Save this provider's row only; other providers are left untouched
+		_upsert_oauth_credential(provider, client_id, client_secret)
 
 		return {
 			"success": True,
@@ -391,6 +474,40 @@ def refresh_token(provider, user=None):
 	if not user:
 		user = frappe.session.user
 
+	# Concurrent callers for the same (user, provider) share one refresh; the
+	# lock outlives the slowest possible request so no second refresh starts
+	from lodgeick.services.single_flight import single_flight
+	lock_ttl = token_refresh_lock_ttl()
+	return single_flight(
+		token_refresh_flight_key(user, provider),
+		lambda: _refresh_token(provider, user),
+		lock_ttl=lock_ttl,
+		wait_timeout=min(frappe.conf.get("token_refresh_wait_timeout") or lock_ttl, lock_ttl)
+	)
+
+
+def token_refresh_flight_key(user, provider):
+	"""Single-flight key shared by every refresh of a user's provider token"""
+	return f"token_refresh:{user}:{provider}"
+
+
+def token_refresh_lock_ttl(requests_in_sequence=1):
+	"""
+	Seconds a refresh lock must be held to cover its token requests
+
+	Args:
+		requests_in_sequence: Token requests made one after another under the lock
+
+	Returns:
+		int: Worst-case request time (timeouts and retries) plus a margin
+	"""
+	from lodgeick.services.provider_http import get_max_request_seconds, get_timeout
+	timeout = get_timeout(frappe.conf.get("oauth_http_timeout"))
+	return math.ceil(requests_in_sequence * get_max_request_seconds(timeout)) + TOKEN_REFRESH_LOCK_MARGIN
+
+
+def _refresh_token(provider, user):
+	"""Refresh a token against the provider and persist it"""
 	# Get existing token
 	token_doc = frappe.get_doc("Integration Token", {
 		"user": user,
@@ -403,30 +520,40 @@ def refresh_token(provider, user=None):
 	provider_config = get_provider_config(provider)
 
 	# Request new access token
-	data = {
-		"client_id": provider_config["client_id"],
-		"client_secret": provider_config["client_secret"],
-		"refresh_token": token_doc.get_password("refresh_token"),
-		"grant_type": "refresh_token"
-	}
+	data = build_refresh_request(provider_config, token_doc.get_password("refresh_token"))
 
-	response = requests.post(provider_config["token_url"], data=data)
+	from lodgeick.services.provider_http import token_request
+	response = token_request(provider, provider_config["token_url"], data)
 
 	if response.status_code != 200:
 		frappe.throw(_("Failed to refresh token: {0}").format(response.text))
 
-	tokens = response.json()
+	store_refreshed_tokens(token_doc, response.json())
+	frappe.db.commit()
+
+	return {
+		"success": True,
+		"message": "Token refreshed successfully"
+	}
+
 
-	# Update token document
+def build_refresh_request(provider_config, refresh_token_value):
+	"""Build the form data for a refresh_token grant"""
+	return {
+		"client_id": provider_config["client_id"],
+		"client_secret": provider_config["client_secret"],
+		"refresh_token": refresh_token_value,
+		"grant_type": "refresh_token"
+	}
+
+
+def store_refreshed_tokens(token_doc, tokens):
+	"""Write a token endpoint response onto an Integration Token (no commit)"""
 	token_doc.access_token = tokens.get("access_token")
 	if tokens.get("refresh_token"):
 		token_doc.refresh_token = tokens.get("refresh_token")
 	token_doc.expires_at = calculate_expiry(tokens.get("expires_in"))
 	token_doc.token_data = json.dumps(tokens)
+	token_doc.refresh_failures = 0
+	token_doc.next_refresh_attempt = None
 	token_doc.save(ignore_permissions=True)
-	frappe.db.commit()
-
-	return {
-		"success": True,
-		"message": "Token refreshed successfully"
-	}
@@ -4,7 +4,7 @@ Exposes tier configuration and setup functions to frontend
 """
 
 import frappe
-from lodgeick.config.oauth_tiers import OAUTH_TIER_CONFIG, get_available_tiers, is_tier_allowed_for_api
+from lodgeick.config.oauth_tiers import OAUTH_TIER_CONFIG, check_tier_access, get_available_tiers, is_tier_allowed_for_api
 
 
 @frappe.whitelist()
@@ -78,3 +78,25 @@ def check_default_credentials_available(provider: str) -> dict:
 		"available": False,
 		"message": f"No default {provider.title()} OAuth credentials configured. Please use AI or Manual setup."
 	}
+
+
+@frappe.whitelist()
+def validate_tier_access(provider: str, tier: str, api_names=None, scopes=None) -> dict:
+	"""
+	Check every API and scope a setup needs against a tier in one call
+
+	Args:
+		provider: Provider name
+		tier: Tier name (default, ai, manual)
+		api_names: List (or JSON list) of API names
+		scopes: List (or JSON list) of OAuth scopes
+
+	Returns:
+		{
+			"allowed": bool,
+			"disallowed_apis": list,
+			"disallowed_scopes": list,
+			"reason": str (if not allowed)
+		}
+	"""
+	return check_tier_access(provider, tier, frappe.parse_json(api_names), frappe.parse_json(scopes))
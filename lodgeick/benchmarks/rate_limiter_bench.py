@@ -0,0 +1,223 @@
+"""
+Rate Limiter Load Test
+Drives consume_rate_limit from many processes and threads against the
+site's MariaDB and Redis, and reports throughput, latency and how far each
+backend strays from the configured limit
+
+Usage:
+	bench --site <site> execute lodgeick.benchmarks.rate_limiter_bench.run \
+		--kwargs "{'requests': 20000, 'processes': 4, 'threads': 8}"
+"""
+
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import frappe
+
+
+BENCH_USER = "Administrator"
+BENCH_PROVIDER = "slack"
+BENCH_TIER = "default"
+
+# Benchmark traffic is spread over throwaway api_name scopes so every run
+# starts from empty counters and can be cleaned up afterwards
+SCOPE_PREFIX = "bench-"
+
+
+def run(
+	requests: int = 20000,
+	processes: int = 2,
+	threads: int = 8,
+	scopes: int = 50,
+	limit: int = 100,
+	backends: Tuple[str, ...] = ("redis", "db"),
+) -> Dict:
+	"""
+	Run the load test for each backend and print a report
+
+	Args:
+		requests: Total consume_rate_limit calls per backend
+		processes: Worker processes
+		threads: Threads per process
+		scopes: Distinct limiter scopes the requests are spread over
+		limit: Daily limit applied to every scope during the run
+		backends: Backends to compare ("redis", "db")
+
+	Returns:
+		dict: backend -> throughput, latency percentiles, over/under-admission
+	"""
+	site = frappe.local.site
+	sites_path = frappe.local.sites_path
+
+	results = {}
+	for backend in backends:
+		results[backend] = run_backend(site, sites_path, backend, requests, processes, threads, scopes, limit)
+
+	print_report(results, limit)
+	return results
+
+
+def run_backend(
+	site: str,
+	sites_path: str,
+	backend: str,
+	requests: int,
+	processes: int,
+	threads: int,
+	scopes: int,
+	limit: int,
+) -> Dict:
+	"""Load test one backend and score its admissions against the limit"""
+	run_id = frappe.generate_hash(length=6)
+	scope_names = [f"{SCOPE_PREFIX}{run_id}-{i}" for i in range(scopes)]
+	per_process = _split(requests, processes)
+
+	offsets = [sum(per_process[:i]) for i in range(processes)]
+	args = [
+		(site, sites_path, backend, scope_names, count, threads, limit, offset)
+		for count, offset in zip(per_process, offsets)
+	]
+
+	# spawn, not fork: each worker opens its own DB and Redis connections
+	context = multiprocessing.get_context("spawn")
+	with context.Pool(processes) as pool:
+		started = time.perf_counter()
+		outcomes = pool.starmap(_process_worker, args)
+		elapsed = time.perf_counter() - started
+
+	latencies = []
+	sent = Counter()
+	admitted = Counter()
+	errors = 0
+	for outcome in outcomes:
+		latencies.extend(outcome["latencies"])
+		sent.update(outcome["sent"])
+		admitted.update(outcome["admitted"])
+		errors += outcome["errors"]
+
+	cleanup(scope_names)
+
+	latencies.sort()
+	return {
+		"requests": requests,
+		"workers": processes * threads,
+		"seconds": round(elapsed, 3),
+		"throughput": round(requests / elapsed, 1) if elapsed else None,
+		"p50_ms": _percentile(latencies, 50),
+		"p99_ms": _percentile(latencies, 99),
+		"admitted": sum(admitted.values()),
+		"expected": sum(min(sent[scope], limit) for scope in sent),
+		"over_admitted": sum(max(0, admitted[scope] - limit) for scope in sent),
+		"under_admitted": sum(max(0, min(sent[scope], limit) - admitted[scope]) for scope in sent),
+		"errors": errors
+	}
+
+
+def print_report(results: Dict, limit: int):
+	"""Print one row per backend"""
+	columns = (
+		"backend", "workers", "throughput", "p50_ms", "p99_ms",
+		"admitted", "expected", "over_admitted", "under_admitted", "errors"
+	)
+	print(f"Rate limiter load test (limit {limit} per scope)")
+	print("  ".join(f"{column:>14}" for column in columns))
+	for backend, result in results.items():
+		row = [backend] + [result[column] for column in columns[1:]]
+		print("  ".join(f"{str(value):>14}" for value in row))
+
+
+def cleanup(scope_names: List[str]):
+	"""Remove usage rows and pending flushes created by a run"""
+	from lodgeick.services import rate_limiter
+
+	frappe.db.delete("OAuth Usage Log", {"api_name": ("like", f"{SCOPE_PREFIX}%")})
+	frappe.db.delete("OAuth Usage Daily", {"api_name": ("like", f"{SCOPE_PREFIX}%")})
+	frappe.db.commit()
+
+	members = [
+		rate_limiter.MEMBER_SEPARATOR.join([BENCH_USER, BENCH_PROVIDER, BENCH_TIER, scope])
+		for scope in scope_names
+	]
+	cache = frappe.cache()
+	cache.execute_command("SREM", cache.make_key(rate_limiter.DIRTY_KEY), *members)
+
+
+def apply_bench_limits(limit: int):
+	"""Give the benchmark tier a plain daily limit and no shared quota (this process only)"""
+	from lodgeick.config.oauth_tiers import OAUTH_TIER_CONFIG, compile_tier_policies
+
+	tier_config = OAUTH_TIER_CONFIG[BENCH_PROVIDER]["tiers"][BENCH_TIER]
+	tier_config["rate_limits"] = {"requests_per_day": limit}
+	tier_config["shared_quota"] = None
+	compile_tier_policies()
+
+
+def _process_worker(site, sites_path, backend, scope_names, count, threads, limit, offset) -> Dict:
+	apply_bench_limits(limit)
+
+	per_thread = _split(count, threads)
+	starts = [offset + sum(per_thread[:i]) for i in range(threads)]
+
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		outcomes = list(executor.map(
+			lambda work: _thread_worker(site, sites_path, backend, scope_names, *work),
+			zip(per_thread, starts)
+		))
+
+	merged = {"latencies": [], "sent": Counter(), "admitted": Counter(), "errors": 0}
+	for outcome in outcomes:
+		merged["latencies"].extend(outcome["latencies"])
+		merged["sent"].update(outcome["sent"])
+		merged["admitted"].update(outcome["admitted"])
+		merged["errors"] += outcome["errors"]
+	return merged
+
+
+def _thread_worker(site, sites_path, backend, scope_names, count, start) -> Dict:
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+	frappe.local.conf.rate_limit_backend = backend
+
+	from lodgeick.lodgeick.doctype.oauth_usage_log.oauth_usage_log import consume_rate_limit
+
+	latencies = []
+	sent = Counter()
+	admitted = Counter()
+	errors = 0
+
+	try:
+		for i in range(start, start + count):
+			scope = scope_names[i % len(scope_names)]
+			sent[scope] += 1
+			began = time.perf_counter()
+			try:
+				result = consume_rate_limit(BENCH_USER, BENCH_PROVIDER, BENCH_TIER, scope)
+			except Exception:
+				errors += 1
+				frappe.db.rollback()
+				continue
+			finally:
+				latencies.append((time.perf_counter() - began) * 1000)
+
+			if result["allowed"]:
+				admitted[scope] += 1
+
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+	return {"latencies": latencies, "sent": sent, "admitted": admitted, "errors": errors}
+
+
+def _split(total: int, parts: int) -> List[int]:
+	return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def _percentile(values: List[float], percentile: int):
+	if not values:
+		return None
+	index = min(len(values) - 1, int(len(values) * percentile / 100))
+	return round(values[index], 3)
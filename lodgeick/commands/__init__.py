@@ -0,0 +1,49 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("import-catalog")
+@click.argument("path", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["jsonl", "csv"]), help="Default: from the file extension")
+@click.option("--dry-run", is_flag=True, default=False, help="Show what would change without writing")
+@click.option("--batch-size", type=int, default=100, help="Apps per transaction")
+@pass_context
+def import_catalog(context, path=None, file_format=None, dry_run=False, batch_size=100):
+	"""
+	Import App Catalog entries and their use cases from JSON lines or CSV
+
+	Without PATH, imports the bundled sample catalog (lodgeick/data/sample_catalog.jsonl),
+	which also documents the JSON lines format.
+	"""
+	from lodgeick.services.catalog_import import import_catalog as run_import
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		path = path or frappe.get_app_path("lodgeick", "data", "sample_catalog.jsonl")
+		summary = run_import(path, file_format=file_format, dry_run=dry_run, batch_size=batch_size)
+	finally:
+		frappe.destroy()
+
+	for name, changes in summary["changes"].items():
+		action = "create" if name in summary["created"] else "update"
+		click.echo(f"{action} {name}")
+		for field, (old, new) in changes.items():
+			click.echo(f"    {field}: {old!r} -> {new!r}")
+
+	for error in summary["errors"]:
+		click.secho(error, fg="red")
+
+	verb = "Would import" if dry_run else "Imported"
+	click.echo(
+		f"{verb}: {len(summary['created'])} created, {len(summary['updated'])} updated, "
+		f"{len(summary['unchanged'])} unchanged, {len(summary['invalid'])} invalid"
+	)
+
+	if summary["errors"]:
+		raise SystemExit(1)
+
+
+commands = [import_catalog]
@@ -3,10 +3,20 @@ OAuth Setup Tier Configuration
 Defines three-tier setup options for different OAuth providers
 """
 
+from types import MappingProxyType
+from typing import Iterable, NamedTuple, Optional
+
 # Three-tier system:
 # 1. Default (Lodgeick Shared App) - Quick start, non-billing only, rate limited
 # 2. AI-Powered - User creates own project via AI wizard, unlimited
 # 3. Manual - User provides existing credentials, unlimited
+#
+# Default tiers have two layers of limits: "rate_limits" apply to each user,
+# "shared_quota" caps the shared OAuth app across all users and is divided
+# into weighted fair shares (see lodgeick.services.shared_quota)
+#
+# The lookup functions below read frozen tables compiled from this dict at
+# import time; call compile_tier_policies() after changing it at runtime.
 
 OAUTH_TIER_CONFIG = {
 	"google": {
@@ -61,6 +71,24 @@ OAUTH_TIER_CONFIG = {
 						"requests_per_minute": 50
 					}
 				},
+				"shared_quota": {
+					"gmail.googleapis.com": {
+						"requests_per_day": 20000,
+						"requests_per_minute": 250
+					},
+					"sheets.googleapis.com": {
+						"requests_per_day": 50000,
+						"requests_per_minute": 300
+					},
+					"drive.googleapis.com": {
+						"requests_per_day": 200000,
+						"requests_per_minute": 1000
+					},
+					"calendar.googleapis.com": {
+						"requests_per_day": 100000,
+						"requests_per_minute": 600
+					}
+				},
 				"requires": []
 			},
 			"ai": {
@@ -126,6 +154,9 @@ OAUTH_TIER_CONFIG = {
 					"requests_per_minute": 20,
 					"requests_per_day": 10000
 				},
+				"shared_quota": {
+					"requests_per_minute": 100
+				},
 				"requires": []
 			},
 			"manual": {
@@ -172,6 +203,9 @@ OAUTH_TIER_CONFIG = {
 					"requests_per_minute": 60,
 					"requests_per_day": 5000
 				},
+				"shared_quota": {
+					"requests_per_minute": 10000
+				},
 				"requires": []
 			},
 			"manual": {
@@ -229,6 +263,17 @@ OAUTH_TIER_CONFIG = {
 						"requests_per_minute": 50
 					}
 				},
+				"shared_quota": {
+					"outlook": {
+						"requests_per_minute": 2000
+					},
+					"onedrive": {
+						"requests_per_minute": 5000
+					},
+					"teams": {
+						"requests_per_minute": 2000
+					}
+				},
 				"requires": []
 			},
 			"manual": {
@@ -275,6 +320,10 @@ OAUTH_TIER_CONFIG = {
 					"requests_per_10_seconds": 100,
 					"requests_per_day": 250000
 				},
+				"shared_quota": {
+					"requests_per_10_seconds": 1000,
+					"requests_per_day": 500000
+				},
 				"requires": []
 			},
 			"manual": {
@@ -349,6 +398,69 @@ OAUTH_TIER_CONFIG = {
 }
 
 
+class TierPolicy(NamedTuple):
+	"""Compiled access rules of one (provider, tier)"""
+	unrestricted: bool
+	allowed_apis: Optional[frozenset]
+	disallowed_scopes: frozenset
+
+
+# (provider, tier) -> TierPolicy
+_TIER_POLICIES = MappingProxyType({})
+
+# (provider, tier, api_name or None) -> limits; None holds the tier-wide value
+_RATE_LIMITS = MappingProxyType({})
+
+# (provider, api_name or None) -> shared app quota of the default tier
+_SHARED_QUOTAS = MappingProxyType({})
+
+
+def _freeze(value):
+	if isinstance(value, dict):
+		return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+	if isinstance(value, list):
+		return tuple(_freeze(item) for item in value)
+	return value
+
+
+def _compile_limits(table: dict, key: tuple, limits):
+	if not limits:
+		return
+	table[key + (None,)] = _freeze(limits)
+	for api_name, api_limits in limits.items():
+		if isinstance(api_limits, dict):
+			table[key + (api_name,)] = _freeze(api_limits)
+
+
+def compile_tier_policies():
+	"""Rebuild the lookup tables from OAUTH_TIER_CONFIG"""
+	global _TIER_POLICIES, _RATE_LIMITS, _SHARED_QUOTAS
+
+	policies = {}
+	rate_limits = {}
+	shared_quotas = {}
+
+	for provider, provider_config in OAUTH_TIER_CONFIG.items():
+		for tier, tier_config in provider_config.get("tiers", {}).items():
+			if not tier_config:
+				continue
+
+			allowed_apis = tier_config.get("allowed_apis", [])
+			policies[(provider, tier)] = TierPolicy(
+				unrestricted=tier in ["manual", "ai"],
+				allowed_apis=None if allowed_apis == "all" else frozenset(allowed_apis),
+				disallowed_scopes=frozenset(tier_config.get("disallowed_scopes", []))
+			)
+
+			_compile_limits(rate_limits, (provider, tier), tier_config.get("rate_limits"))
+			if tier == "default":
+				_compile_limits(shared_quotas, (provider,), tier_config.get("shared_quota"))
+
+	_TIER_POLICIES = MappingProxyType(policies)
+	_RATE_LIMITS = MappingProxyType(rate_limits)
+	_SHARED_QUOTAS = MappingProxyType(shared_quotas)
+
+
 def get_available_tiers(provider: str) -> dict:
 	"""
 	Get available OAuth tiers for a provider
@@ -378,40 +490,75 @@ def is_tier_allowed_for_api(provider: str, tier: str, api_name: str, scopes: lis
 			"reason": str (if not allowed)
 		}
 	"""
-	provider_config = OAUTH_TIER_CONFIG.get(provider, {})
-	tier_config = provider_config.get("tiers", {}).get(tier, {})
+	policy = _TIER_POLICIES.get((provider, tier))
 
-	if not tier_config:
+	if not policy:
 		return {"allowed": False, "reason": "Invalid tier"}
 
 	# Manual/AI tiers allow everything
-	if tier in ["manual", "ai"]:
+	if policy.unrestricted:
 		return {"allowed": True}
 
-	# Default tier - check restrictions
-	allowed_apis = tier_config.get("allowed_apis", [])
-	disallowed_scopes = tier_config.get("disallowed_scopes", [])
-
 	# Check if API is allowed
-	if allowed_apis != "all":
-		if api_name not in allowed_apis:
-			return {
-				"allowed": False,
-				"reason": f"{api_name} requires AI or Manual setup. Not available in Quick Start tier."
-			}
+	if policy.allowed_apis is not None and api_name not in policy.allowed_apis:
+		return {
+			"allowed": False,
+			"reason": f"{api_name} requires AI or Manual setup. Not available in Quick Start tier."
+		}
 
 	# Check if any scope is disallowed
-	if scopes and disallowed_scopes:
-		for scope in scopes:
-			if scope in disallowed_scopes:
-				return {
-					"allowed": False,
-					"reason": f"Full access scope requires AI or Manual setup for privacy/security."
-				}
+	if scopes and not policy.disallowed_scopes.isdisjoint(scopes):
+		return {
+			"allowed": False,
+			"reason": f"Full access scope requires AI or Manual setup for privacy/security."
+		}
 
 	return {"allowed": True}
 
 
+def check_tier_access(provider: str, tier: str, api_names: Iterable[str] = None, scopes: Iterable[str] = None) -> dict:
+	"""
+	Validate a whole set of APIs and scopes against a tier in one call
+
+	Args:
+		provider: Provider name
+		tier: Tier name (default, ai, manual)
+		api_names: APIs the setup needs
+		scopes: OAuth scopes the setup requests
+
+	Returns:
+		{
+			"allowed": bool,
+			"disallowed_apis": list,
+			"disallowed_scopes": list,
+			"reason": str (if not allowed)
+		}
+	"""
+	policy = _TIER_POLICIES.get((provider, tier))
+
+	if not policy:
+		return {"allowed": False, "disallowed_apis": [], "disallowed_scopes": [], "reason": "Invalid tier"}
+
+	if policy.unrestricted:
+		return {"allowed": True, "disallowed_apis": [], "disallowed_scopes": []}
+
+	api_names = set(api_names or [])
+	blocked_apis = api_names - policy.allowed_apis if policy.allowed_apis is not None else set()
+	blocked_scopes = policy.disallowed_scopes.intersection(scopes or [])
+
+	result = {
+		"allowed": not blocked_apis and not blocked_scopes,
+		"disallowed_apis": sorted(blocked_apis),
+		"disallowed_scopes": sorted(blocked_scopes)
+	}
+	if blocked_apis:
+		result["reason"] = f"{', '.join(result['disallowed_apis'])} requires AI or Manual setup. Not available in Quick Start tier."
+	elif blocked_scopes:
+		result["reason"] = "Full access scope requires AI or Manual setup for privacy/security."
+
+	return result
+
+
 def get_rate_limit(provider: str, tier: str, api_name: str = None) -> dict:
 	"""
 	Get rate limit configuration for a provider/tier/api
@@ -422,17 +569,33 @@ def get_rate_limit(provider: str, tier: str, api_name: str = None) -> dict:
 		api_name: Optional specific API name
 
 	Returns:
-		Rate limit configuration or None
+		Read-only rate limit configuration or None
+	"""
+	if api_name:
+		limits = _RATE_LIMITS.get((provider, tier, api_name))
+		if limits is not None:
+			return limits
+
+	return _RATE_LIMITS.get((provider, tier, None))
+
+
+def get_shared_quota(provider: str, api_name: str = None) -> dict:
+	"""
+	Get the site-wide quota of the shared (default tier) OAuth app
+
+	Args:
+		provider: Provider name
+		api_name: Optional specific API name
+
+	Returns:
+		Read-only quota configuration or None
 	"""
-	provider_config = OAUTH_TIER_CONFIG.get(provider, {})
-	tier_config = provider_config.get("tiers", {}).get(tier, {})
-	rate_limits = tier_config.get("rate_limits")
+	if api_name:
+		quota = _SHARED_QUOTAS.get((provider, api_name))
+		if quota is not None:
+			return quota
 
-	if not rate_limits:
-		return None
+	return _SHARED_QUOTAS.get((provider, None))
 
-	# If api_name specified and rate_limits is nested by API
-	if api_name and isinstance(rate_limits, dict) and api_name in rate_limits:
-		return rate_limits[api_name]
 
-	return rate_limits
+compile_tier_policies()
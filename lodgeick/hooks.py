@@ -98,6 +98,14 @@ fixtures = [
 	{"dt": "App Catalog", "filters": [["name", "in", ["xero", "google_sheets", "hubspot", "slack"]]]}
 ]
 
+# Migration
+# ---------
+
+after_migrate = [
+	"lodgeick.services.catalog_cache.rebuild_category_counts",
+	"lodgeick.services.catalog_snapshot.build_catalog_snapshot"
+]
+
 # Uninstallation
 # ------------
 
@@ -179,6 +187,31 @@ fixtures = [
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"* * * * *": [
+			"lodgeick.tasks.usage_flush_job.flush_usage_counters",
+			"lodgeick.tasks.deferred_release_job.release_deferred_requests"
+		],
+		"*/5 * * * *": [
+			"lodgeick.tasks.token_refresh_job.refresh_expiring_tokens"
+		]
+	},
+	"daily": [
+		"lodgeick.lodgeick.doctype.integration_token.integration_token.compact_integration_tokens",
+		"lodgeick.lodgeick.doctype.oauth_usage_daily.oauth_usage_daily.prune_usage_history"
+	]
+}
+
+# Cache
+# -----
+# Called on `bench clear-cache` / frappe.clear_cache()
+
+clear_cache = [
+	"lodgeick.services.provider_config.invalidate_provider_configs",
+	"lodgeick.services.catalog_cache.clear_catalog_cache",
+]
+
 # Testing
 # -------
 
@@ -4,6 +4,9 @@
 import frappe
 from frappe.model.document import Document
 
+from lodgeick.services.catalog_cache import bump_catalog_version_after_commit, update_category_counts
+from lodgeick.services.catalog_snapshot import enqueue_catalog_snapshot
+
 
 class AppCatalog(Document):
 	"""Catalog of available SaaS apps for integration"""
@@ -15,6 +18,35 @@ class AppCatalog(Document):
 		if not self.display_name:
 			frappe.throw("Display name is required")
 
+	def on_update(self):
+		"""Invalidate cached catalog responses (use cases are saved with the app)"""
+		previous = self.get_doc_before_save()
+		update_category_counts(_counted_category(previous), _counted_category(self))
+		self.catalog_changed()
+
+	def on_trash(self):
+		update_category_counts(_counted_category(self), None)
+		self.catalog_changed()
+
+	def after_rename(self, old, new, merge=False):
+		self.catalog_changed()
+
+	def catalog_changed(self):
+		"""New catalog version and static snapshot once this change commits"""
+		if frappe.flags.in_catalog_import:
+			# Bulk imports bump the version and rebuild the snapshot once at the end
+			return
+
+		bump_catalog_version_after_commit()
+		enqueue_catalog_snapshot()
+
 	def get_use_cases_list(self):
 		"""Get list of use cases"""
 		return [uc.use_case_name for uc in self.use_cases]
+
+
+def _counted_category(doc):
+	"""Category an app counts towards in get_categories, if any"""
+	if doc and doc.is_active and doc.category:
+		return doc.category
+	return None
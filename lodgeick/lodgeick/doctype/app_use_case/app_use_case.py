@@ -1,9 +1,15 @@
 # Copyright (c) 2025, Lodgeick and contributors
 # For license information, please see license.txt
 
+import frappe
 from frappe.model.document import Document
 
 
 class AppUseCase(Document):
 	"""Child table for app use cases"""
 	pass
+
+
+def on_doctype_update():
+	"""Index use case lookups by app (see services.workflow_templates)"""
+	frappe.db.add_index("App Use Case", ["parent", "use_case_name"])
@@ -1,6 +1,8 @@
 # Copyright (c) 2025, Lodgeick and contributors
 # For license information, please see license.txt
 
+from functools import partial
+
 import frappe
 from frappe.model.document import Document
 
@@ -15,6 +17,20 @@ class IntegrationToken(Document):
 		if not self.user:
 			frappe.throw("User is required")
 
+	def on_update(self):
+		"""Drop the cached access token so readers see the new one"""
+		self._invalidate_token_cache()
+
+	def on_trash(self):
+		"""Drop the cached access token when the token is revoked"""
+		self._invalidate_token_cache()
+
+	def _invalidate_token_cache(self):
+		from lodgeick.services.token_store import invalidate_token_cache
+		invalidate_token_cache(self.user, self.provider)
+		# Again once committed: a concurrent miss before then re-caches the old token
+		frappe.db.after_commit.add(partial(invalidate_token_cache, self.user, self.provider))
+
 	def is_expired(self):
 		"""Check if token is expired"""
 		import frappe.utils
@@ -28,3 +44,103 @@ class IntegrationToken(Document):
 		if self.token_data:
 			return json.loads(self.token_data)
 		return {}
+
+	@staticmethod
+	def upsert(user, provider, access_token, refresh_token=None, expires_at=None, token_data=None):
+		"""
+		Create or update the single token row for (user, provider)
+
+		A missing refresh_token keeps the stored one, since providers only
+		return it on first consent or when they rotate it.
+		"""
+		for attempt in range(2):
+			name = frappe.db.get_value(
+				"Integration Token",
+				{"user": user, "provider": provider},
+				"name",
+				order_by="modified desc"
+			)
+
+			if name:
+				token_doc = frappe.get_doc("Integration Token", name)
+			else:
+				token_doc = frappe.get_doc({
+					"doctype": "Integration Token",
+					"user": user,
+					"provider": provider
+				})
+
+			token_doc.access_token = access_token
+			if refresh_token:
+				token_doc.refresh_token = refresh_token
+			token_doc.expires_at = expires_at
+			token_doc.token_data = token_data
+			# A reconnect gives background refresh a fresh start
+			token_doc.refresh_failures = 0
+			token_doc.next_refresh_attempt = None
+
+			try:
+				if name:
+					token_doc.save(ignore_permissions=True)
+				else:
+					token_doc.insert(ignore_permissions=True)
+				return token_doc
+			except (frappe.DuplicateEntryError, frappe.UniqueValidationError):
+				# A concurrent callback inserted the row first; update it instead
+				if attempt:
+					raise
+
+
+def on_doctype_update():
+	"""One token row per (user, provider)"""
+	frappe.db.add_unique("Integration Token", ["user", "provider"], constraint_name="unique_user_provider")
+
+
+def compact_integration_tokens():
+	"""
+	Merge duplicate Integration Token rows, keeping the newest per (user, provider)
+
+	If the newest row has no refresh token, the most recent older one is
+	carried over before the duplicates are deleted.
+
+	Returns:
+		int: Number of rows removed
+	"""
+	from frappe.query_builder.functions import Count
+
+	IntegrationTokenTable = frappe.qb.DocType("Integration Token")
+	duplicates = (
+		frappe.qb.from_(IntegrationTokenTable)
+		.select(IntegrationTokenTable.user, IntegrationTokenTable.provider)
+		.groupby(IntegrationTokenTable.user, IntegrationTokenTable.provider)
+		.having(Count(IntegrationTokenTable.name) > 1)
+	).run(as_dict=True)
+
+	removed = 0
+	for dup in duplicates:
+		names = frappe.get_all(
+			"Integration Token",
+			filters={"user": dup.user, "provider": dup.provider},
+			pluck="name",
+			order_by="modified desc"
+		)
+		keep = frappe.get_doc("Integration Token", names[0])
+
+		if not keep.get_password("refresh_token", raise_exception=False):
+			for name in names[1:]:
+				older_refresh = frappe.get_doc("Integration Token", name).get_password("refresh_token", raise_exception=False)
+				if older_refresh:
+					keep.refresh_token = older_refresh
+					keep.save(ignore_permissions=True)
+					break
+
+		for name in names[1:]:
+			frappe.delete_doc("Integration Token", name, ignore_permissions=True, force=True)
+			removed += 1
+
+		frappe.db.commit()
+
+	if removed:
+		frappe.logger().info(f"Compacted Integration Token: removed {removed} duplicate rows")
+
+	return removed
@@ -6,4 +6,9 @@ from frappe.model.document import Document
 
 
 class OAuthCredentialsSettings(Document):
-	pass
+	def on_update(self):
+		"""Drop cached provider configs so the new credentials are picked up"""
+		from lodgeick.services.provider_config import invalidate_provider_configs
+		invalidate_provider_configs()
+		# Again once committed: a concurrent miss before then re-caches the old rows
+		frappe.db.after_commit.add(invalidate_provider_configs)
@@ -0,0 +1,35 @@
+# Copyright (c) 2026, Lodgeick and contributors
+# For license information, please see license.txt
+
+"""
+OAuth Usage Daily DocType
+Per-day request history written by the usage flush job
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, nowdate
+
+
+DEFAULT_RETENTION_DAYS = 365
+
+
+class OAuthUsageDaily(Document):
+	"""Requests per day for one (user, provider, tier, api)"""
+	pass
+
+
+def on_doctype_update():
+	"""One row per day and scope so the flush job can upsert absolute totals"""
+	frappe.db.add_unique(
+		"OAuth Usage Daily",
+		["usage_date", "user", "provider", "tier", "api_name"],
+		constraint_name="unique_usage_day"
+	)
+	frappe.db.add_index("OAuth Usage Daily", ["provider", "usage_date"])
+
+
+def prune_usage_history():
+	"""Scheduled job: drop daily rows older than usage_history_days (default 365)"""
+	retention = cint(frappe.conf.get("usage_history_days")) or DEFAULT_RETENTION_DAYS
+	frappe.db.delete("OAuth Usage Daily", {"usage_date": ("<", add_days(nowdate(), -retention))})
@@ -4,46 +4,110 @@ Tracks API usage for rate limiting on shared OAuth apps
 """
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
 from datetime import datetime, timedelta
 from lodgeick.config.oauth_tiers import get_rate_limit
 
 
+UNLIMITED_TIERS = ("ai", "manual")
+RATE_LIMIT_EXCEEDED_MESSAGE = "Rate limit exceeded. Please upgrade to AI or Manual setup for unlimited access."
+SHARED_QUOTA_EXCEEDED_MESSAGE = "The shared {0} app is at capacity. Please retry shortly, or upgrade to AI or Manual setup for a dedicated quota."
+
+# Tier served by Lodgeick's shared OAuth apps, which also have a site-wide quota
+SHARED_TIER = "default"
+
+
 class OAuthUsageLog(Document):
 	"""Track OAuth API usage for rate limiting"""
 
 	def before_save(self):
-		"""Reset counters if time periods have elapsed"""
-		now = datetime.now()
-
-		# Reset daily counter if a day has passed
-		if self.last_reset_daily:
-			last_reset = frappe.utils.get_datetime(self.last_reset_daily)
-			if (now - last_reset).total_seconds() > 86400:  # 24 hours
-				self.requests_today = 0
-				self.last_reset_daily = now
-				self.warning_sent = 0
-
-		# Reset minute counter if a minute has passed
-		if self.last_reset_minute:
-			last_reset = frappe.utils.get_datetime(self.last_reset_minute)
-			if (now - last_reset).total_seconds() > 60:  # 1 minute
-				self.requests_this_minute = 0
-				self.last_reset_minute = now
-
-		# Update status based on limits
+		"""Keep status in line with the counters; resets run in reset_usage_counters()"""
 		self.update_status()
 
 	def update_status(self):
 		"""Update status based on current usage"""
-		if self.daily_limit and self.requests_today >= self.daily_limit:
-			self.status = "Limit Reached"
-		elif self.minute_limit and self.requests_this_minute >= self.minute_limit:
-			self.status = "Limit Reached"
-		elif self.daily_limit and self.requests_today >= (self.daily_limit * 0.8):
-			self.status = "Warning"
-		else:
-			self.status = "Active"
+		self.status = usage_status(
+			self.requests_today, self.requests_this_minute, self.daily_limit, self.minute_limit
+		)
+
+
+def usage_status(requests_today: int, requests_this_minute: int, daily_limit: int, minute_limit: int) -> str:
+	"""Status for a usage row's counters and limits"""
+	requests_today = requests_today or 0
+	requests_this_minute = requests_this_minute or 0
+
+	if daily_limit and requests_today >= daily_limit:
+		return "Limit Reached"
+	elif minute_limit and requests_this_minute >= minute_limit:
+		return "Limit Reached"
+	elif daily_limit and requests_today >= (daily_limit * 0.8):
+		return "Warning"
+	return "Active"
+
+
+def on_doctype_update():
+	"""One usage row per (user, provider, tier, api_name) so flushes can upsert"""
+	frappe.db.add_unique(
+		"OAuth Usage Log",
+		["user", "provider", "tier", "api_name"],
+		constraint_name="unique_usage_scope"
+	)
+
+
+def reset_usage_counters():
+	"""
+	Zero elapsed minute and daily counters across all usage rows
+
+	Set-based and idempotent: a row is only reset when its reset timestamp is
+	older than the period, so re-running after a worker restart is harmless.
+	"""
+	from frappe.query_builder import Case
+
+	now = datetime.now()
+	UsageLog = frappe.qb.DocType("OAuth Usage Log")
+
+	(
+		frappe.qb.update(UsageLog)
+		.set(UsageLog.requests_this_minute, 0)
+		.set(UsageLog.last_reset_minute, now)
+		.where(
+			UsageLog.last_reset_minute.isnull()
+			| (UsageLog.last_reset_minute <= now - timedelta(minutes=1))
+		)
+	).run()
+
+	(
+		frappe.qb.update(UsageLog)
+		.set(UsageLog.requests_today, 0)
+		.set(UsageLog.warning_sent, 0)
+		.set(UsageLog.last_reset_daily, now)
+		.where(
+			UsageLog.last_reset_daily.isnull()
+			| (UsageLog.last_reset_daily <= now - timedelta(days=1))
+		)
+	).run()
+
+	status = (
+		Case()
+		.when((UsageLog.daily_limit > 0) & (UsageLog.requests_today >= UsageLog.daily_limit), "Limit Reached")
+		.when((UsageLog.minute_limit > 0) & (UsageLog.requests_this_minute >= UsageLog.minute_limit), "Limit Reached")
+		.when((UsageLog.daily_limit > 0) & (UsageLog.requests_today >= UsageLog.daily_limit * 0.8), "Warning")
+		.else_("Active")
+	)
+	frappe.qb.update(UsageLog).set(UsageLog.status, status).where(UsageLog.status != status).run()
+
+
+def get_rate_limit_backend() -> str:
+	"""Rate limit backend from site config: "redis" (default) or "db" """
+	return frappe.conf.get("rate_limit_backend") or "redis"
+
+
+def _scoped_user(user: str = None) -> str:
+	"""The user a whitelisted call may act for: anyone for System Managers, else themselves"""
+	if not user or (user != frappe.session.user and "System Manager" not in frappe.get_roles()):
+		return frappe.session.user
+	return user
 
 
 @frappe.whitelist()
@@ -51,6 +115,10 @@ def check_rate_limit(user: str, provider: str, tier: str, api_name: str = None)
 	"""
 	Check if user has exceeded rate limits
 
+	Does not count a request; use consume_rate_limit() to check and count
+	in one step. Only System Managers may check another user's limits;
+	anyone else gets their own.
+
 	Args:
 		user: User email
 		provider: OAuth provider (google, slack, etc.)
@@ -62,18 +130,159 @@ def check_rate_limit(user: str, provider: str, tier: str, api_name: str = None)
 			"allowed": bool,
 			"remaining_today": int,
 			"remaining_minute": int,
+			"retry_after": float,
 			"message": str
 		}
 	"""
-	# AI and manual tiers have no rate limits
-	if tier in ["ai", "manual"]:
-		return {
-			"allowed": True,
-			"remaining_today": None,
-			"remaining_minute": None,
-			"message": "Unlimited"
-		}
+	user = _scoped_user(user)
+
+	if tier in UNLIMITED_TIERS:
+		return _unlimited()
+
+	if get_rate_limit_backend() == "db":
+		return _check_rate_limit_db(user, provider, tier, api_name)
+
+	from lodgeick.services import rate_limiter, shared_quota
+
+	result = _format_decision(rate_limiter.evaluate(user, provider, tier, api_name, mode="peek"))
+	if result["allowed"] and tier == SHARED_TIER:
+		_apply_shared_quota(result, provider, shared_quota.evaluate(user, provider, api_name, mode="peek"))
+	return result
+
+
+def consume_rate_limit(user: str, provider: str, tier: str, api_name: str = None, cost: int = 1) -> dict:
+	"""
+	Atomically check the rate limit and count the request if it is allowed
+
+	Use this instead of check_rate_limit() followed by record_api_request():
+	concurrent workers cannot both pass the check for the last remaining slot.
+	Default-tier requests must also fit the shared app's quota; if they do
+	not, everything counted for the user (limits, history and last request
+	time) is refunded.
+
+	Server-side only (not whitelisted): it counts against any user's quota.
+
+	Args:
+		user: User email
+		provider: OAuth provider
+		tier: OAuth tier
+		api_name: Optional API name
+		cost: Number of requests to count
+
+	Returns:
+		Same shape as check_rate_limit()
+	"""
+	if tier in UNLIMITED_TIERS:
+		return _unlimited()
+
+	if get_rate_limit_backend() == "db":
+		result = _check_rate_limit_db(user, provider, tier, api_name)
+		if result["allowed"]:
+			_record_api_request_db(user, provider, tier, api_name)
+		return result
+
+	from lodgeick.services import rate_limiter, shared_quota
+
+	cost = int(cost)
+	decision = rate_limiter.check_and_consume(user, provider, tier, api_name, cost)
+	result = _format_decision(decision)
+	if result["allowed"] and tier == SHARED_TIER:
+		_apply_shared_quota(result, provider, shared_quota.evaluate(user, provider, api_name, cost))
+		if not result["allowed"]:
+			rate_limiter.refund(user, provider, tier, api_name, decision["counted"])
+	return result
+
+
+@frappe.whitelist()
+def record_api_request(user: str, provider: str, tier: str, api_name: str = None):
+	"""
+	Record an API request for rate limiting
 
+	Only System Managers may record requests for another user; anyone else
+	records against their own quota.
+
+	Args:
+		user: User email
+		provider: OAuth provider
+		tier: OAuth tier
+		api_name: Optional API name
+	"""
+	user = _scoped_user(user)
+
+	if tier in UNLIMITED_TIERS:
+		return
+
+	if get_rate_limit_backend() == "db":
+		return _record_api_request_db(user, provider, tier, api_name)
+
+	from lodgeick.services import rate_limiter, shared_quota
+
+	rate_limiter.evaluate(user, provider, tier, api_name, mode="record")
+	if tier == SHARED_TIER:
+		shared_quota.evaluate(user, provider, api_name, mode="record")
+
+
+def _unlimited() -> dict:
+	return {
+		"allowed": True,
+		"remaining_today": None,
+		"remaining_minute": None,
+		"retry_after": 0,
+		"message": "Unlimited"
+	}
+
+
+def _format_decision(decision: dict) -> dict:
+	"""Map a rate_limiter decision onto the check_rate_limit() response"""
+	if not decision["limited"]:
+		message = "No limits configured"
+	elif decision["allowed"]:
+		message = "OK"
+	else:
+		message = _(RATE_LIMIT_EXCEEDED_MESSAGE)
+
+	return {
+		"allowed": decision["allowed"],
+		"remaining_today": decision["remaining"].get(86400),
+		"remaining_minute": decision["remaining"].get(60),
+		"retry_after": round(decision["retry_after"], 3),
+		"message": message
+	}
+
+
+def _apply_shared_quota(result: dict, provider: str, decision: dict):
+	"""Fold a shared_quota decision into a check_rate_limit() response"""
+	if not decision["limited"]:
+		return
+
+	result["shared_quota"] = {
+		"reason": decision["reason"],
+		"windows": decision["windows"]
+	}
+	if not decision["allowed"]:
+		result["allowed"] = False
+		result["retry_after"] = max(result["retry_after"], round(decision["retry_after"], 3))
+		result["message"] = _(SHARED_QUOTA_EXCEEDED_MESSAGE).format(provider.title())
+
+
+def _check_rate_limit_db(user: str, provider: str, tier: str, api_name: str = None) -> dict:
+	"""
+	Check rate limits against the OAuth Usage Log row (legacy "db" backend)
+
+	Args:
+		user: User email
+		provider: OAuth provider (google, slack, etc.)
+		tier: OAuth tier (default, ai, manual)
+		api_name: Optional specific API name
+
+	Returns:
+		{
+			"allowed": bool,
+			"remaining_today": int,
+			"remaining_minute": int,
+			"message": str
+		}
+	"""
 	# Get rate limit configuration
 	rate_config = get_rate_limit(provider, tier, api_name)
 	if not rate_config:
@@ -139,7 +348,7 @@ def check_rate_limit(user: str, provider: str, tier: str, api_name: str = None)
 			"allowed": False,
 			"remaining_today": max(0, remaining_daily) if remaining_daily is not None else None,
 			"remaining_minute": max(0, remaining_minute) if remaining_minute is not None else None,
-			"message": "Rate limit exceeded. Please upgrade to AI or Manual setup for unlimited access."
+			"message": _(RATE_LIMIT_EXCEEDED_MESSAGE)
 		}
 
 	remaining_daily = usage_log.daily_limit - usage_log.requests_today if usage_log.daily_limit else None
@@ -153,10 +362,9 @@ def check_rate_limit(user: str, provider: str, tier: str, api_name: str = None)
 	}
 
 
-@frappe.whitelist()
-def record_api_request(user: str, provider: str, tier: str, api_name: str = None):
+def _record_api_request_db(user: str, provider: str, tier: str, api_name: str = None):
 	"""
-	Record an API request for rate limiting
+	Count an API request on the OAuth Usage Log row (legacy "db" backend)
 
 	Args:
 		user: User email
@@ -164,10 +372,6 @@ def record_api_request(user: str, provider: str, tier: str, api_name: str = None
 		tier: OAuth tier
 		api_name: Optional API name
 	"""
-	# Skip tracking for ai/manual tiers
-	if tier in ["ai", "manual"]:
-		return
-
 	# Find usage log
 	usage_log = frappe.db.get_value(
 		"OAuth Usage Log",
@@ -190,18 +394,21 @@ def record_api_request(user: str, provider: str, tier: str, api_name: str = None
 
 
 @frappe.whitelist()
-def get_usage_stats(user: str, provider: str = None) -> list:
+def get_usage_stats(user: str = None, provider: str = None) -> list:
 	"""
 	Get usage statistics for a user
 
+	Only System Managers may read another user's statistics; anyone else
+	gets their own.
+
 	Args:
-		user: User email
+		user: User email (default: current user)
 		provider: Optional filter by provider
 
 	Returns:
 		List of usage statistics
 	"""
-	filters = {"user": user}
+	filters = {"user": _scoped_user(user)}
 	if provider:
 		filters["provider"] = provider
 
@@ -18,6 +18,8 @@ class UserIntegration(Document):
 
 	def after_insert(self):
 		"""Create corresponding n8n workflow after integration is created"""
+		self._invalidate_counts()
+
 		if frappe.conf.get("n8n_auto_sync", True):
 			try:
 				from lodgeick.services.n8n_sync import get_n8n_sync_service
@@ -30,6 +32,13 @@ class UserIntegration(Document):
 
 	def on_update(self):
 		"""Update corresponding n8n workflow when integration is updated"""
+		if self.has_value_changed("status") or self.has_value_changed("source_app") or self.has_value_changed("target_app"):
+			self._invalidate_counts()
+
+		if self.has_value_changed("status") or self.has_value_changed("error_message"):
+			from lodgeick.services.realtime import publish_integration_update
+			publish_integration_update(self)
+
 		if frappe.conf.get("n8n_auto_sync", True):
 			# Check if this is a status change
 			if self.has_value_changed("status"):
@@ -40,6 +49,11 @@ class UserIntegration(Document):
 
 	def on_trash(self):
 		"""Delete corresponding n8n workflow when integration is deleted"""
+		self._invalidate_counts()
+
+		from lodgeick.services.realtime import publish_integration_update
+		publish_integration_update(self, "deleted")
+
 		if frappe.conf.get("n8n_auto_sync", True):
 			try:
 				from lodgeick.services.n8n_sync import get_n8n_sync_service
@@ -50,6 +64,11 @@ class UserIntegration(Document):
 				# Don't prevent integration deletion if n8n delete fails
 				pass
 
+	def _invalidate_counts(self):
+		"""Drop the owner's cached integration counts"""
+		from lodgeick.services.integration_query import invalidate_integration_counts
+		invalidate_integration_counts(self.user)
+
 	def _sync_update_to_n8n(self):
 		"""Sync integration update to n8n"""
 		try:
@@ -140,3 +159,8 @@ class UserIntegration(Document):
 		except Exception as e:
 			frappe.log_error(f"Failed to get execution history: {str(e)}", "N8N Client Error")
 			return []
+
+
+def on_doctype_update():
+	"""Index backing keyset pagination of a user's integrations"""
+	frappe.db.add_index("User Integration", ["user", "modified", "name"])
@@ -0,0 +1,6 @@
+from lodgeick.lodgeick.doctype.app_use_case.app_use_case import on_doctype_update
+
+
+def execute():
+	"""Add the (parent, use_case_name) index used to resolve workflow templates"""
+	on_doctype_update()
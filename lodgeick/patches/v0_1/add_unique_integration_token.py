@@ -0,0 +1,6 @@
+from lodgeick.lodgeick.doctype.integration_token.integration_token import on_doctype_update
+
+
+def execute():
+	"""Add the (user, provider) unique key to existing sites"""
+	on_doctype_update()
@@ -0,0 +1,6 @@
+from lodgeick.lodgeick.doctype.oauth_usage_log.oauth_usage_log import on_doctype_update
+
+
+def execute():
+	"""Add the (user, provider, tier, api_name) unique key flushes upsert on"""
+	on_doctype_update()
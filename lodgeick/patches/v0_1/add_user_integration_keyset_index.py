@@ -0,0 +1,6 @@
+from lodgeick.lodgeick.doctype.user_integration.user_integration import on_doctype_update
+
+
+def execute():
+	"""Add the (user, modified, name) index used by keyset pagination"""
+	on_doctype_update()
@@ -0,0 +1,10 @@
+import frappe
+
+
+def execute():
+	"""Remove duplicate Integration Tokens before the (user, provider) unique key is added"""
+	if not frappe.db.table_exists("Integration Token"):
+		return
+
+	from lodgeick.lodgeick.doctype.integration_token.integration_token import compact_integration_tokens
+	compact_integration_tokens()
@@ -0,0 +1,28 @@
+import frappe
+
+
+def execute():
+	"""Keep the newest OAuth Usage Log per scope before the unique key is added"""
+	if not frappe.db.table_exists("OAuth Usage Log"):
+		return
+
+	from frappe.query_builder.functions import Count
+
+	UsageLog = frappe.qb.DocType("OAuth Usage Log")
+	frappe.qb.update(UsageLog).set(UsageLog.api_name, "").where(UsageLog.api_name.isnull()).run()
+
+	duplicates = (
+		frappe.qb.from_(UsageLog)
+		.select(UsageLog.user, UsageLog.provider, UsageLog.tier, UsageLog.api_name)
+		.groupby(UsageLog.user, UsageLog.provider, UsageLog.tier, UsageLog.api_name)
+		.having(Count(UsageLog.name) > 1)
+	).run(as_dict=True)
+
+	for dup in duplicates:
+		names = frappe.get_all(
+			"OAuth Usage Log",
+			filters={"user": dup.user, "provider": dup.provider, "tier": dup.tier, "api_name": dup.api_name},
+			pluck="name",
+			order_by="modified desc"
+		)
+		frappe.db.delete("OAuth Usage Log", {"name": ("in", names[1:])})
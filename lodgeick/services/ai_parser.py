@@ -4,10 +4,18 @@ Uses Claude AI to interpret natural language and map to Google APIs
 """
 
 import frappe
+import hashlib
 import json
+import re
+import time
 from typing import Dict, List, Optional
 import anthropic
 
+from lodgeick.services import metrics
+
+
+MODEL = "claude-3-5-sonnet-20241022"
+
 
 # Known billing-required APIs (canonical Google API identifiers)
 BILLING_REQUIRED_APIS = [
@@ -107,6 +115,115 @@ Output Format (JSON only, no markdown):
   "reasoning": "Brief explanation of why these APIs and scopes were chosen"
 }"""
 
+USER_PROMPT_TEMPLATE = "Parse this integration request:\n\n{intent}"
+
+# Parsed intents are cached per prompt version: changing the model, the
+# prompts or the billing list starts a fresh cache
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps([MODEL, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, sorted(BILLING_REQUIRED_APIS)]).encode()
+).hexdigest()[:12]
+
+INTENT_CACHE_PREFIX = "lodgeick:ai_intent"
+DEFAULT_INTENT_CACHE_TTL = 7 * 86400
+DEFAULT_INTENT_CACHE_SIZE = 1000
+
+INTENT_STOPWORDS = frozenset([
+    "a", "an", "and", "are", "be", "can", "could", "for", "from", "i", "in", "into", "is", "it",
+    "like", "me", "my", "need", "of", "on", "our", "please", "so", "that", "the", "this", "to",
+    "want", "we", "when", "with", "would",
+])
+INTENT_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Entries live in one hash as "<expires at>|<json>" next to an LRU zset of
+# the same members; both share a hash tag so each script stays on one slot
+
+# Returns a cached intent and marks it recently used
+# KEYS: entries, LRU zset; ARGV: now, member
+GET_INTENT_SCRIPT = """
+local value = redis.call('HGET', KEYS[1], ARGV[2])
+if value then
+    local separator = string.find(value, '|', 1, true)
+    if tonumber(string.sub(value, 1, separator - 1)) > tonumber(ARGV[1]) then
+        redis.call('ZADD', KEYS[2], ARGV[1], ARGV[2])
+        return string.sub(value, separator + 1)
+    end
+    redis.call('HDEL', KEYS[1], ARGV[2])
+end
+redis.call('ZREM', KEYS[2], ARGV[2])
+return false
+"""
+
+# Stores an intent and evicts the least recently used beyond the size limit
+# KEYS: entries, LRU zset; ARGV: value, ttl, now, member, max entries
+SET_INTENT_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[4], (tonumber(ARGV[3]) + tonumber(ARGV[2])) .. '|' .. ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('HDEL', KEYS[1], unpack(evicted))
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+end
+return excess
+"""
+
+
+def normalize_intent(user_intent: str) -> str:
+    """
+    Cache key form of an intent: lowercase words without stopwords, sorted
+
+    "Send emails from Sheets" and "send emails from sheets please" both
+    normalise to "emails send sheets".
+    """
+    tokens = INTENT_TOKEN_PATTERN.findall((user_intent or "").lower())
+    return " ".join(sorted(token for token in tokens if token not in INTENT_STOPWORDS))
+
+
+def get_cached_intent(user_intent: str) -> Optional[Dict]:
+    """Cached parse of an equivalent intent for the current prompt version"""
+    keys = _intent_cache_keys(user_intent)
+    if not keys:
+        return None
+
+    cache = frappe.cache()
+    entries_key, lru_key, member = keys
+    value = cache.register_script(GET_INTENT_SCRIPT)(keys=[entries_key, lru_key], args=[time.time(), member])
+
+    metrics.increment("ai_parser.intent_cache", 1, {"result": "hit" if value else "miss"})
+    return json.loads(value) if value else None
+
+
+def cache_intent(user_intent: str, parsed: Dict):
+    """Cache a successful parse, evicting least recently used intents over the size limit"""
+    keys = _intent_cache_keys(user_intent)
+    if not keys:
+        return
+
+    cache = frappe.cache()
+    entries_key, lru_key, member = keys
+    cache.register_script(SET_INTENT_SCRIPT)(
+        keys=[entries_key, lru_key],
+        args=[
+            json.dumps(parsed),
+            frappe.conf.get("ai_intent_cache_ttl") or DEFAULT_INTENT_CACHE_TTL,
+            time.time(),
+            member,
+            frappe.conf.get("ai_intent_cache_size") or DEFAULT_INTENT_CACHE_SIZE,
+        ]
+    )
+
+
+def _intent_cache_keys(user_intent: str):
+    normalized = normalize_intent(user_intent)
+    if not normalized:
+        return None
+
+    prefix = frappe.cache().make_key(f"{INTENT_CACHE_PREFIX}:{{{PROMPT_VERSION}}}")
+    member = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"{prefix}:entries", f"{prefix}:lru", member
+
 
 class AIIntentParser:
     """Parse user intent using Claude AI to determine required Google APIs and scopes"""
@@ -135,17 +252,21 @@ class AIIntentParser:
                 "reasoning": str
             }
         """
+        cached = get_cached_intent(user_intent)
+        if cached is not None:
+            return cached
+
         try:
             # Call Claude API
             message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+                model=MODEL,
                 max_tokens=2000,
                 temperature=0.2,  # Low temperature for consistent, deterministic output
                 system=SYSTEM_PROMPT,
                 messages=[
                     {
                         "role": "user",
-                        "content": f"Parse this integration request:\n\n{user_intent}"
+                        "content": USER_PROMPT_TEMPLATE.format(intent=user_intent)
                     }
                 ]
             )
@@ -181,6 +302,7 @@ class AIIntentParser:
                 parsed["billing_required"] = False
                 parsed["billing_apis"] = []
 
+            cache_intent(user_intent, parsed)
             return parsed
 
         except json.JSONDecodeError as e:
@@ -0,0 +1,213 @@
+"""
+Versioned Cache for Public Catalog Endpoints
+Caches catalog API responses in Redis under a catalog version that changes
+whenever an App Catalog (or one of its use cases) changes, and answers
+repeat requests with 304 Not Modified via ETags
+"""
+
+import hashlib
+import json
+from functools import partial
+from typing import Callable, Dict, Optional
+
+import frappe
+from werkzeug.wrappers import Response
+
+
+VERSION_KEY = "lodgeick:catalog_version"
+RESPONSE_PREFIX = "lodgeick:catalog_response"
+
+# Responses are keyed by version, so this only bounds memory for stale ones
+RESPONSE_TTL = 86400
+
+# Active app count per category, kept up to date by App Catalog hooks and
+# rebuilt from the DB only when missing (after migrate, import or
+# clear-cache). The generation counts deltas that arrived while the hash was
+# not loaded, so a load computed before such a delta is discarded. Both keys
+# share a hash tag, so the scripts stay within one cluster slot.
+CATEGORY_COUNTS_KEY = "lodgeick:{catalog_category_counts}"
+CATEGORY_COUNTS_GENERATION_KEY = "lodgeick:{catalog_category_counts}:generation"
+READY_FIELD = "__ready__"
+
+# Loads the counts unless the hash was built or a delta missed it meanwhile
+# KEYS: counts hash, generation; ARGV: generation read before counting,
+# then field, count pairs
+LOAD_COUNTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+	return 0
+end
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+	return 0
+end
+for i = 2, #ARGV, 2 do
+	redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Applies a delta to a loaded hash; otherwise invalidates any load in progress
+# KEYS: counts hash, generation; ARGV: ready field, category, delta
+ADJUST_COUNT_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+	redis.call('INCR', KEYS[2])
+	return 0
+end
+local count = redis.call('HINCRBY', KEYS[1], ARGV[2], ARGV[3])
+if count <= 0 then
+	redis.call('HDEL', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def get_catalog_version() -> str:
+	"""Current catalog version, created on first use"""
+	version = frappe.cache().get_value(VERSION_KEY)
+	if not version:
+		version = bump_catalog_version()
+	return version
+
+
+def bump_catalog_version(*args, **kwargs) -> str:
+	"""Start a new catalog version; cached responses of older versions are never read again"""
+	version = frappe.generate_hash(length=12)
+	frappe.cache().set_value(VERSION_KEY, version)
+	return version
+
+
+def clear_catalog_cache(*args, **kwargs):
+	"""Start a new version and rebuild category counts on next use (bench clear-cache)"""
+	bump_catalog_version()
+	frappe.cache().delete(frappe.cache().make_key(CATEGORY_COUNTS_KEY))
+
+
+def bump_catalog_version_after_commit():
+	"""Bump once the current transaction commits, so no request caches pre-commit data"""
+	frappe.db.after_commit.add(bump_catalog_version)
+
+
+def get_category_counts() -> Dict[str, int]:
+	"""
+	Active app count per category
+
+	Served from a Redis hash maintained incrementally by App Catalog hooks;
+	built with one GROUP BY query when missing.
+	"""
+	cache = frappe.cache()
+	keys = _category_counts_keys()
+	raw = cache.execute_command("HGETALL", keys[0])
+
+	if not raw:
+		generation = frappe.safe_decode(cache.execute_command("GET", keys[1])) or "0"
+		counts = _count_categories()
+		args = [generation, READY_FIELD, 1]
+		for category, count in counts.items():
+			args.extend([category, count])
+		cache.register_script(LOAD_COUNTS_SCRIPT)(keys=keys, args=args)
+		return counts
+
+	counts = {frappe.safe_decode(field): int(value) for field, value in raw.items()}
+	counts.pop(READY_FIELD, None)
+	return counts
+
+
+def rebuild_category_counts(*args, **kwargs):
+	"""Recount categories from the DB, e.g. after migrate or a bulk import"""
+	frappe.cache().delete(frappe.cache().make_key(CATEGORY_COUNTS_KEY))
+	return get_category_counts()
+
+
+def update_category_counts(old_category: Optional[str], new_category: Optional[str]):
+	"""
+	Move an active app between categories once the transaction commits
+
+	Args:
+		old_category: Category it was counted under (None if it was not counted)
+		new_category: Category it counts under now (None if inactive or deleted)
+	"""
+	if old_category == new_category:
+		return
+	if old_category:
+		frappe.db.after_commit.add(partial(_adjust_category_count, old_category, -1))
+	if new_category:
+		frappe.db.after_commit.add(partial(_adjust_category_count, new_category, 1))
+
+
+def _adjust_category_count(category: str, delta: int):
+	cache = frappe.cache()
+	cache.register_script(ADJUST_COUNT_SCRIPT)(
+		keys=_category_counts_keys(),
+		args=[READY_FIELD, category, delta]
+	)
+
+
+def _category_counts_keys() -> list:
+	cache = frappe.cache()
+	return [cache.make_key(CATEGORY_COUNTS_KEY), cache.make_key(CATEGORY_COUNTS_GENERATION_KEY)]
+
+
+def _count_categories() -> Dict[str, int]:
+	from frappe.query_builder.functions import Count
+
+	AppCatalog = frappe.qb.DocType("App Catalog")
+	rows = (
+		frappe.qb.from_(AppCatalog)
+		.select(AppCatalog.category, Count(AppCatalog.name))
+		.where((AppCatalog.is_active == 1) & AppCatalog.category.isnotnull() & (AppCatalog.category != ""))
+		.groupby(AppCatalog.category)
+	).run()
+	return {category: count for category, count in rows}
+
+
+def cached_response(endpoint: str, args: Dict, build: Callable[[], Dict]):
+	"""
+	Serve a catalog endpoint from the versioned cache with ETag support
+
+	Args:
+		endpoint: Endpoint name, part of the cache key
+		args: Arguments that select the response
+		build: Computes the response on a cache miss
+
+	Returns:
+		A werkzeug Response (200 with the JSON body, or 304) during an HTTP
+		request, otherwise the response dict; error responses (success
+		False) are returned as a dict, uncached
+	"""
+	version = get_catalog_version()
+	digest = hashlib.sha1(
+		json.dumps([version, endpoint, args], sort_keys=True, default=str).encode()
+	).hexdigest()
+
+	request = getattr(frappe.local, "request", None)
+	etag = f'"{digest}"'
+	if request is not None and etag in _if_none_match(request):
+		return _response(None, etag, status=304)
+
+	cache_key = f"{RESPONSE_PREFIX}:{digest}"
+	body = frappe.cache().get_value(cache_key)
+	if body is None:
+		message = build()
+		if message.get("success") is False:
+			# Errors (e.g. unknown apps) are not cached: guests could
+			# otherwise add an entry per made-up argument
+			return message
+		body = frappe.as_json({"message": message}, indent=None)
+		frappe.cache().set_value(cache_key, body, expires_in_sec=RESPONSE_TTL)
+
+	if request is None:
+		return json.loads(body)["message"]
+
+	return _response(body, etag)
+
+
+def _if_none_match(request) -> list:
+	header = request.headers.get("If-None-Match") or ""
+	return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def _response(body: Optional[str], etag: str, status: int = 200) -> Response:
+	response = Response(body, status=status, mimetype="application/json")
+	response.headers["ETag"] = etag
+	# Clients and proxies may keep a copy but must revalidate it every time
+	response.headers["Cache-Control"] = "no-cache"
+	return response
@@ -0,0 +1,245 @@
+"""
+Bulk App Catalog Import
+Streams apps and use cases from JSON lines or CSV, validates them and
+upserts them in batched transactions; used by `bench import-catalog`
+
+JSON lines: one app per line, with its use cases nested under "use_cases"
+(see lodgeick/data/sample_catalog.jsonl).
+CSV: one row per use case, app columns repeated on each row and rows of
+the same app kept together; an app without use cases is a row with empty
+use case columns. Use case columns are use_case_name,
+use_case_description and workflow_template_id.
+"""
+
+import csv
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import frappe
+from frappe.utils import cint
+
+
+APP_FIELDS = ("app_name", "display_name", "logo_url", "description", "category", "is_active", "oauth_provider")
+USE_CASE_FIELDS = ("use_case_name", "description", "workflow_template_id")
+CSV_USE_CASE_COLUMNS = {
+	"use_case_name": "use_case_name",
+	"use_case_description": "description",
+	"workflow_template_id": "workflow_template_id",
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class CatalogImportError(frappe.ValidationError):
+	pass
+
+
+def import_catalog(
+	path: str,
+	file_format: Optional[str] = None,
+	dry_run: bool = False,
+	batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict:
+	"""
+	Import a catalog file
+
+	Unchanged apps are skipped, so re-running the same file is a no-op. The
+	catalog version is bumped and the snapshot rebuilt once at the end
+	instead of once per app.
+
+	Args:
+		path: JSON lines (.jsonl) or CSV (.csv) file
+		file_format: 'jsonl' or 'csv' (default: from the extension)
+		dry_run: Only report what would change
+		batch_size: Apps per transaction
+
+	Returns:
+		dict: created, updated, unchanged and invalid app names, the
+		field-level changes per app, and errors
+	"""
+	file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+	summary = {"created": [], "updated": [], "unchanged": [], "invalid": [], "changes": {}, "errors": []}
+
+	with open(path, newline="", encoding="utf-8") as f:
+		records = read_csv(f) if file_format == "csv" else read_jsonl(f)
+		batch_size = cint(batch_size) or DEFAULT_BATCH_SIZE
+
+		frappe.flags.in_catalog_import = True
+		try:
+			while True:
+				batch = list(islice(records, batch_size))
+				if not batch:
+					break
+				_import_batch(batch, dry_run, summary)
+		finally:
+			frappe.flags.in_catalog_import = False
+
+	if not dry_run and (summary["created"] or summary["updated"]):
+		from lodgeick.services.catalog_cache import bump_catalog_version, rebuild_category_counts
+		from lodgeick.services.catalog_snapshot import enqueue_catalog_snapshot
+
+		rebuild_category_counts()
+		bump_catalog_version()
+		enqueue_catalog_snapshot()
+		frappe.db.commit()
+
+	return summary
+
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Dict]:
+	"""Yield one app per non-empty JSON line"""
+	for line_number, line in enumerate(lines, 1):
+		line = line.strip()
+		if not line:
+			continue
+		try:
+			yield json.loads(line)
+		except json.JSONDecodeError as e:
+			yield {"__error__": f"line {line_number}: invalid JSON ({e.msg})"}
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Dict]:
+	"""Yield one app per run of rows sharing an app_name"""
+	current = None
+	seen = set()
+	skipped = None
+
+	for row in csv.DictReader(lines):
+		app_name = (row.get("app_name") or "").strip()
+		if app_name == skipped:
+			continue
+		if current is None or app_name != current["app_name"]:
+			if current is not None:
+				yield current
+			if app_name in seen:
+				yield {"app_name": app_name, "__error__": f"{app_name}: rows of an app must be contiguous"}
+				current, skipped = None, app_name
+				continue
+			skipped = None
+			seen.add(app_name)
+			current = {field: row.get(field) for field in APP_FIELDS if field in row}
+			current["app_name"] = app_name
+			current["use_cases"] = []
+
+		use_case = {field: row.get(column) for column, field in CSV_USE_CASE_COLUMNS.items()}
+		if any(use_case.values()):
+			current["use_cases"].append(use_case)
+
+	if current is not None:
+		yield current
+
+
+def validate_record(record: Dict, categories: List[str]) -> Dict:
+	"""
+	Normalise an app record
+
+	Raises:
+		CatalogImportError: If the record cannot be imported
+	"""
+	if record.get("__error__"):
+		raise CatalogImportError(record["__error__"])
+
+	app = {field: _clean(record.get(field)) for field in APP_FIELDS}
+	if not app["app_name"]:
+		raise CatalogImportError("app_name is required")
+	if not app["display_name"]:
+		raise CatalogImportError(f"{app['app_name']}: display_name is required")
+	if app["category"] and app["category"] not in categories:
+		raise CatalogImportError(f"{app['app_name']}: unknown category {app['category']}")
+	app["is_active"] = 1 if app["is_active"] is None else cint(app["is_active"])
+
+	use_cases = []
+	names = set()
+	for use_case in record.get("use_cases") or []:
+		use_case = {field: _clean(use_case.get(field)) for field in USE_CASE_FIELDS}
+		if not use_case["use_case_name"]:
+			raise CatalogImportError(f"{app['app_name']}: use_case_name is required")
+		if use_case["use_case_name"] in names:
+			raise CatalogImportError(f"{app['app_name']}: duplicate use case {use_case['use_case_name']}")
+		names.add(use_case["use_case_name"])
+		use_cases.append(use_case)
+
+	app["use_cases"] = use_cases
+	return app
+
+
+def _import_batch(batch: List[Dict], dry_run: bool, summary: Dict):
+	from lodgeick.api.catalog import attach_use_cases
+
+	categories = (frappe.get_meta("App Catalog").get_field("category").options or "").split("\n")
+
+	apps = []
+	for record in batch:
+		try:
+			apps.append(validate_record(record, categories))
+		except CatalogImportError as e:
+			summary["invalid"].append(record.get("app_name"))
+			summary["errors"].append(str(e))
+
+	if not apps:
+		return
+
+	existing = frappe.get_all(
+		"App Catalog",
+		filters={"name": ["in", [app["app_name"] for app in apps]]},
+		fields=["name"] + list(APP_FIELDS)
+	)
+	existing = {row.name: row for row in attach_use_cases(existing)}
+
+	writes = []
+	for app in apps:
+		current = existing.get(app["app_name"])
+		changes = _diff(current, app)
+		if current and not changes:
+			summary["unchanged"].append(app["app_name"])
+			continue
+		summary["updated" if current else "created"].append(app["app_name"])
+		summary["changes"][app["app_name"]] = changes
+		writes.append((app, current is not None))
+
+	if dry_run or not writes:
+		return
+
+	try:
+		for app, exists in writes:
+			doc = frappe.get_doc("App Catalog", app["app_name"]) if exists else frappe.new_doc("App Catalog")
+			doc.update({field: app[field] for field in APP_FIELDS})
+			doc.set("use_cases", app["use_cases"])
+			doc.save(ignore_permissions=True)
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		names = [app["app_name"] for app, _ in writes]
+		for key in ("created", "updated"):
+			summary[key] = [name for name in summary[key] if name not in names]
+		summary["invalid"].extend(names)
+		summary["errors"].append(f"Batch {names[0]}..{names[-1]} rolled back: {e}")
+
+
+def _diff(current: Optional[Dict], app: Dict) -> Dict:
+	"""Field -> (old, new) for every field that differs"""
+	changes = {}
+	for field in APP_FIELDS:
+		old = _clean(current.get(field)) if current else None
+		if field == "is_active" and current:
+			old = cint(old)
+		if old != app[field]:
+			changes[field] = (old, app[field])
+
+	old_use_cases = [
+		{field: _clean(use_case.get(field)) for field in USE_CASE_FIELDS}
+		for use_case in (current.get("use_cases") if current else None) or []
+	]
+	if old_use_cases != app["use_cases"]:
+		changes["use_cases"] = (
+			[use_case["use_case_name"] for use_case in old_use_cases],
+			[use_case["use_case_name"] for use_case in app["use_cases"]]
+		)
+	return changes
+
+
+def _clean(value):
+	if isinstance(value, str):
+		value = value.strip()
+	return value if value not in ("", None) else None
@@ -0,0 +1,290 @@
+"""
+Catalog Search Index
+Process-local inverted index over active App Catalog entries and their use
+cases, with BM25 ranking, prefix matching for the last word typed and
+single-typo tolerance
+"""
+
+import copy
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import frappe
+
+from lodgeick.services.catalog_cache import get_catalog_version
+
+
+# Relative weight of a term occurrence per field
+FIELD_WEIGHTS = {
+	"display_name": 3.0,
+	"app_name": 3.0,
+	"category": 1.5,
+	"use_case_name": 2.0,
+	"description": 1.0,
+	"use_case_description": 0.75,
+}
+
+# Score factor for terms that only match as a prefix or with a typo
+PREFIX_FACTOR = 0.8
+TYPO_FACTOR = 0.6
+MAX_PREFIX_EXPANSIONS = 50
+MIN_TYPO_LENGTH = 4
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(["a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"])
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# site -> (catalog version, CatalogIndex)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+	"""Lowercase alphanumeric tokens without stopwords"""
+	if not text:
+		return []
+	return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class CatalogIndex:
+	"""
+	Inverted index of catalog apps, updated one app at a time
+
+	Not safe to update while other threads search it: update a copy() and
+	publish that instead.
+	"""
+
+	def __init__(self):
+		self.apps = {}
+		self.modified = {}
+		self.lengths = {}
+		self.doc_terms = {}
+		self.postings = defaultdict(dict)
+		self.total_length = 0.0
+		self._sorted_terms = None
+		self._deletes = None
+
+	def copy(self) -> "CatalogIndex":
+		"""Copy that can be updated without affecting searches on this index"""
+		index = CatalogIndex()
+		# App rows and term sets are replaced on update, never changed in place
+		index.apps = dict(self.apps)
+		index.modified = dict(self.modified)
+		index.lengths = dict(self.lengths)
+		index.doc_terms = dict(self.doc_terms)
+		index.postings = defaultdict(dict, {term: dict(postings) for term, postings in self.postings.items()})
+		index.total_length = self.total_length
+		return index
+
+	def add(self, app: Dict, modified):
+		"""Index (or re-index) an app row that has use_cases attached"""
+		self.remove(app["name"])
+
+		weights = defaultdict(float)
+		length = 0.0
+		fields = [(field, app.get(field)) for field in ("display_name", "app_name", "category", "description")]
+		for use_case in app.get("use_cases") or []:
+			fields.append(("use_case_name", use_case.get("use_case_name")))
+			fields.append(("use_case_description", use_case.get("description")))
+
+		for field, text in fields:
+			for token in tokenize(text):
+				weights[token] += FIELD_WEIGHTS[field]
+				length += FIELD_WEIGHTS[field]
+
+		for term, weight in weights.items():
+			self.postings[term][app["name"]] = weight
+
+		self.apps[app["name"]] = app
+		self.modified[app["name"]] = modified
+		self.lengths[app["name"]] = length
+		self.doc_terms[app["name"]] = set(weights)
+		self.total_length += length
+		self._sorted_terms = self._deletes = None
+
+	def remove(self, name: str):
+		"""Drop an app from the index if present"""
+		terms = self.doc_terms.pop(name, None)
+		if terms is None:
+			return
+
+		for term in terms:
+			postings = self.postings[term]
+			postings.pop(name, None)
+			if not postings:
+				del self.postings[term]
+
+		self.total_length -= self.lengths.pop(name)
+		self.apps.pop(name)
+		self.modified.pop(name)
+		self._sorted_terms = self._deletes = None
+
+	def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+		"""
+		Rank apps matching every word of the query
+
+		The last word also matches as a prefix (search-as-you-type); words
+		with no exact match fall back to terms one edit away.
+
+		Returns:
+			App rows (copies) ordered by relevance, then display name
+		"""
+		tokens = tokenize(query)
+		if not tokens or not self.apps:
+			return []
+
+		scores = None
+		for position, token in enumerate(tokens):
+			token_scores = self._score_token(token, prefix=position == len(tokens) - 1)
+			if scores is None:
+				scores = token_scores
+			else:
+				scores = {name: score + token_scores[name] for name, score in scores.items() if name in token_scores}
+			if not scores:
+				return []
+
+		ranked = sorted(scores, key=lambda name: (-scores[name], self.apps[name].get("display_name") or ""))
+		if limit:
+			ranked = ranked[:limit]
+		return [copy.deepcopy(self.apps[name]) for name in ranked]
+
+	def _score_token(self, token: str, prefix: bool) -> Dict[str, float]:
+		"""Best BM25 score per app for one query word"""
+		candidates = {}
+		if token in self.postings:
+			candidates[token] = 1.0
+
+		if prefix:
+			for term in self._prefix_terms(token):
+				candidates.setdefault(term, PREFIX_FACTOR)
+
+		if not candidates and len(token) >= MIN_TYPO_LENGTH:
+			for term in self._typo_terms(token):
+				candidates[term] = TYPO_FACTOR
+
+		scores = {}
+		for term, factor in candidates.items():
+			for name, score in self._bm25(term).items():
+				score *= factor
+				if score > scores.get(name, 0):
+					scores[name] = score
+		return scores
+
+	def _bm25(self, term: str) -> Dict[str, float]:
+		postings = self.postings.get(term) or {}
+		count = len(self.apps)
+		average_length = self.total_length / count if count else 1.0
+		idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+
+		return {
+			name: idf * tf * (BM25_K1 + 1) / (
+				tf + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[name] / average_length)
+			)
+			for name, tf in postings.items()
+		}
+
+	def _prefix_terms(self, token: str) -> List[str]:
+		if self._sorted_terms is None:
+			self._sorted_terms = sorted(self.postings)
+
+		terms = []
+		start = bisect_left(self._sorted_terms, token)
+		for term in self._sorted_terms[start:start + MAX_PREFIX_EXPANSIONS]:
+			if not term.startswith(token):
+				break
+			if term != token:
+				terms.append(term)
+		return terms
+
+	def _typo_terms(self, token: str) -> Set[str]:
+		"""Terms within one insertion, deletion, substitution or transposition"""
+		if self._deletes is None:
+			deletes = defaultdict(set)
+			for term in self.postings:
+				if len(term) >= MIN_TYPO_LENGTH - 1:
+					for variant in _deletions(term) | {term}:
+						deletes[variant].add(term)
+			self._deletes = deletes
+
+		candidates = set()
+		for variant in _deletions(token) | {token}:
+			candidates |= self._deletes.get(variant, set())
+		return {term for term in candidates if _within_one_edit(token, term)}
+
+
+def get_index() -> CatalogIndex:
+	"""
+	Index for the current site, synced to the current catalog version
+
+	On a version change only apps whose modified timestamp changed are
+	re-indexed and removed apps are dropped, on a copy that then replaces
+	the published index, so concurrent searches never see a partial update.
+	"""
+	site = frappe.local.site
+	version = get_catalog_version()
+
+	entry = _indexes.get(site)
+	if entry and entry[0] == version:
+		return entry[1]
+
+	with _indexes_lock:
+		entry = _indexes.get(site)
+		if entry and entry[0] == version:
+			return entry[1]
+
+		index = entry[1].copy() if entry else CatalogIndex()
+		_sync_index(index)
+		_indexes[site] = (version, index)
+		return index
+
+
+def search(query: str, limit: Optional[int] = None) -> List[Dict]:
+	"""Search active catalog apps; see CatalogIndex.search"""
+	return get_index().search(query, limit)
+
+
+def _sync_index(index: CatalogIndex):
+	from lodgeick.api.catalog import APP_FIELDS, attach_use_cases
+
+	current = {
+		row.name: row.modified
+		for row in frappe.get_all("App Catalog", filters={"is_active": 1}, fields=["name", "modified"])
+	}
+
+	for name in set(index.apps) - set(current):
+		index.remove(name)
+
+	changed = [name for name, modified in current.items() if index.modified.get(name) != modified]
+	if not changed:
+		return
+
+	apps = frappe.get_all("App Catalog", filters={"name": ["in", changed]}, fields=APP_FIELDS)
+	for app in attach_use_cases(apps):
+		index.add(app, current[app.name])
+
+
+def _deletions(term: str) -> Set[str]:
+	return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+	if a == b:
+		return True
+	if abs(len(a) - len(b)) > 1:
+		return False
+	if len(a) == len(b):
+		diffs = [i for i in range(len(a)) if a[i] != b[i]]
+		if len(diffs) == 1:
+			return True
+		return (
+			len(diffs) == 2 and diffs[1] == diffs[0] + 1
+			and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+		)
+	shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+	return any(longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
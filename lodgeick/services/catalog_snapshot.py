@@ -0,0 +1,106 @@
+"""
+Static Catalog Snapshot
+Writes the public catalog (apps, use cases and category counts) to the
+app's public assets as content-hashed JSON with gzip and, when available,
+brotli siblings, so the landing page can load it straight from nginx
+"""
+
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+import frappe
+
+
+SNAPSHOT_DIR = ("public", "catalog")
+ASSET_URL = "/assets/lodgeick/catalog/"
+
+# Site default holding the current snapshot filename
+SNAPSHOT_DEFAULT = "lodgeick_catalog_snapshot"
+
+BUILD_JOB_ID = "lodgeick_catalog_snapshot"
+
+
+def build_catalog_snapshot() -> str:
+	"""
+	Write the catalog snapshot and make it current for the site
+
+	The filename carries a hash of the content, so it can be cached forever
+	and an unchanged catalog reuses the existing file. The site's previous
+	snapshot is removed.
+
+	Returns:
+		str: Snapshot filename
+	"""
+	from lodgeick.api.catalog import get_app_catalog_data
+	from lodgeick.services.catalog_cache import get_category_counts
+
+	snapshot = get_app_catalog_data()
+	snapshot["categories"] = get_category_counts()
+	body = frappe.as_json(snapshot, indent=None).encode()
+
+	# Hashing the site in as well keeps sites sharing the app from ever
+	# pointing at (and deleting) each other's files
+	digest = hashlib.sha256(frappe.local.site.encode() + b"\0" + body).hexdigest()[:16]
+	filename = f"catalog.{digest}.json"
+	directory = frappe.get_app_path("lodgeick", *SNAPSHOT_DIR)
+	os.makedirs(directory, exist_ok=True)
+
+	path = os.path.join(directory, filename)
+	if not os.path.exists(path):
+		_write_atomic(path + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+		brotli = _brotli()
+		if brotli:
+			_write_atomic(path + ".br", brotli.compress(body))
+		# The plain file last: its presence means the set is complete
+		_write_atomic(path, body)
+
+	previous = frappe.db.get_default(SNAPSHOT_DEFAULT)
+	if previous != filename:
+		frappe.db.set_default(SNAPSHOT_DEFAULT, filename)
+		frappe.db.commit()
+		if previous:
+			_remove_snapshot(directory, previous)
+
+	return filename
+
+
+def enqueue_catalog_snapshot():
+	"""Rebuild the snapshot in the background after the current transaction commits"""
+	frappe.enqueue(
+		"lodgeick.services.catalog_snapshot.build_catalog_snapshot",
+		queue="short",
+		job_id=f"{BUILD_JOB_ID}:{frappe.local.site}",
+		deduplicate=True,
+		enqueue_after_commit=True
+	)
+
+
+def get_snapshot_url() -> Optional[str]:
+	"""Asset URL of the current snapshot, if one has been built"""
+	filename = frappe.db.get_default(SNAPSHOT_DEFAULT)
+	return ASSET_URL + filename if filename else None
+
+
+def _write_atomic(path: str, data: bytes):
+	temp_path = f"{path}.{frappe.generate_hash(length=6)}.tmp"
+	with open(temp_path, "wb") as f:
+		f.write(data)
+	os.replace(temp_path, path)
+
+
+def _remove_snapshot(directory: str, filename: str):
+	for suffix in ("", ".gz", ".br"):
+		try:
+			os.remove(os.path.join(directory, filename + suffix))
+		except FileNotFoundError:
+			pass
+
+
+def _brotli():
+	try:
+		import brotli
+	except ImportError:
+		return None
+	return brotli
@@ -0,0 +1,204 @@
+"""
+Deferred Execution Queue for Rate-Limited Work
+Opt-in alternative to rejecting over-limit default-tier requests: the job is
+parked in a per-user Redis queue and released once the limit reopens
+"""
+
+import json
+import time
+from typing import Dict, Optional
+
+import frappe
+from frappe.utils import cint
+
+from lodgeick.services import metrics
+
+
+QUEUE_PREFIX = "lodgeick:deferred:queue:"
+
+# user -> unix time at which the head of their queue should be retried
+SCHEDULE_KEY = "lodgeick:deferred:schedule"
+
+DEFAULT_MAX_AGE = 3600
+
+# Only the shared-app tier is rate limited
+DEFERRABLE_TIER = "default"
+
+# KEYS: user queue, schedule; ARGV: entry, user, due
+PUSH_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], 'NX', ARGV[3], ARGV[2])
+return redis.call('LLEN', KEYS[1])
+"""
+
+# KEYS: user queue, schedule; ARGV: user
+POP_SCRIPT = """
+local entry = redis.call('LPOP', KEYS[1])
+if redis.call('LLEN', KEYS[1]) == 0 then
+	redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return entry
+"""
+
+# KEYS: user queue, schedule; ARGV: user
+DROP_IF_EMPTY_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+	return redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+
+def is_enabled() -> bool:
+	"""Deferral is opt-in via site config rate_limit_deferral_enabled"""
+	return bool(frappe.conf.get("rate_limit_deferral_enabled"))
+
+
+def get_max_age() -> int:
+	"""Seconds a deferred request may wait before it is dropped"""
+	return cint(frappe.conf.get("deferred_queue_max_age")) or DEFAULT_MAX_AGE
+
+
+def submit(
+	method: str,
+	user: str,
+	provider: str,
+	tier: str,
+	api_name: Optional[str] = None,
+	cost: int = 1,
+	queue: str = "default",
+	**kwargs
+) -> Dict:
+	"""
+	Enqueue a rate-limited background job now, or defer it until allowed
+
+	The rate limit is consumed when the job is released, so a deferred job
+	never runs ahead of the limit. Jobs of one user are released in the
+	order they were submitted.
+
+	Args:
+		method: Dotted path of the job function
+		user: User the request counts against
+		provider: OAuth provider
+		tier: OAuth tier
+		api_name: Optional API name
+		cost: Requests the job will make
+		queue: RQ queue to enqueue into
+		**kwargs: JSON-serialisable arguments for the job
+
+	Returns:
+		dict: status ('enqueued', 'deferred' or 'rejected') plus the
+		consume_rate_limit() result for rejections
+	"""
+	from lodgeick.lodgeick.doctype.oauth_usage_log.oauth_usage_log import consume_rate_limit
+
+	deferrable = tier == DEFERRABLE_TIER and is_enabled()
+	entry = {
+		"id": frappe.generate_hash(length=12),
+		"method": method,
+		"kwargs": kwargs,
+		"provider": provider,
+		"tier": tier,
+		"api_name": api_name,
+		"cost": cost,
+		"queue": queue,
+		"submitted_at": time.time()
+	}
+
+	# Never overtake the user's already deferred jobs
+	if deferrable and queue_length(user):
+		_push(user, entry, time.time())
+		return {"status": "deferred", "id": entry["id"], "retry_after": None}
+
+	result = consume_rate_limit(user, provider, tier, api_name, cost)
+	if result["allowed"]:
+		_enqueue(entry)
+		return {"status": "enqueued", "id": entry["id"]}
+
+	if not deferrable or result["retry_after"] > get_max_age():
+		return {"status": "rejected", **result}
+
+	_push(user, entry, time.time() + result["retry_after"])
+	metrics.increment("rate_limit.deferred", 1, {"provider": provider})
+	return {"status": "deferred", "id": entry["id"], "retry_after": result["retry_after"]}
+
+
+def release_due() -> Optional[float]:
+	"""
+	Release deferred jobs whose users are due for a retry
+
+	For each due user the queue head is retried against the rate limit
+	until one is refused, which reschedules that user for its retry_after.
+
+	Returns:
+		float: Unix time the next user is due, or None if nothing is queued
+	"""
+	from lodgeick.lodgeick.doctype.oauth_usage_log.oauth_usage_log import consume_rate_limit
+
+	cache = frappe.cache()
+	schedule_key = cache.make_key(SCHEDULE_KEY)
+	max_age = get_max_age()
+
+	for user in cache.execute_command("ZRANGEBYSCORE", schedule_key, "-inf", time.time()):
+		user = frappe.safe_decode(user)
+		queue_key = _queue_key(user)
+
+		while True:
+			raw = cache.execute_command("LINDEX", queue_key, 0)
+			if raw is None:
+				cache.register_script(DROP_IF_EMPTY_SCRIPT)(keys=[queue_key, schedule_key], args=[user])
+				break
+
+			entry = json.loads(raw)
+			waited = time.time() - entry["submitted_at"]
+			if waited > max_age:
+				_pop(user)
+				metrics.increment("rate_limit.deferred_expired", 1, {"provider": entry["provider"]})
+				continue
+
+			result = consume_rate_limit(
+				user, entry["provider"], entry["tier"], entry["api_name"], entry["cost"]
+			)
+			if not result["allowed"]:
+				cache.execute_command("ZADD", schedule_key, "XX", time.time() + result["retry_after"], user)
+				break
+
+			_pop(user)
+			_enqueue(entry)
+			metrics.observe("rate_limit.deferred_wait_ms", waited * 1000, {"provider": entry["provider"]})
+
+	head = cache.execute_command("ZRANGE", schedule_key, 0, 0, "WITHSCORES")
+	return float(head[1]) if head else None
+
+
+def queue_length(user: str) -> int:
+	"""Number of deferred jobs waiting for a user"""
+	return cint(frappe.cache().execute_command("LLEN", _queue_key(user)))
+
+
+def queue_depth() -> int:
+	"""Deferred jobs waiting across all users"""
+	cache = frappe.cache()
+	users = cache.execute_command("ZRANGE", cache.make_key(SCHEDULE_KEY), 0, -1)
+	return sum(queue_length(frappe.safe_decode(user)) for user in users)
+
+
+def _enqueue(entry: Dict):
+	frappe.enqueue(entry["method"], queue=entry["queue"], **entry["kwargs"])
+
+
+def _push(user: str, entry: Dict, due: float):
+	cache = frappe.cache()
+	cache.register_script(PUSH_SCRIPT)(
+		keys=[_queue_key(user), cache.make_key(SCHEDULE_KEY)],
+		args=[json.dumps(entry, default=str), user, due]
+	)
+
+
+def _pop(user: str):
+	cache = frappe.cache()
+	cache.register_script(POP_SCRIPT)(keys=[_queue_key(user), cache.make_key(SCHEDULE_KEY)], args=[user])
+
+
+def _queue_key(user: str) -> str:
+	return frappe.cache().make_key(QUEUE_PREFIX + user)
@@ -0,0 +1,201 @@
+"""
+User Integration Listing Service
+Keyset-paginated, projected queries over a user's integrations
+"""
+
+import base64
+import json
+from typing import Dict, List, Optional
+
+import frappe
+from frappe import _
+from frappe.query_builder import Order
+from frappe.query_builder.functions import Count
+
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+# Columns a caller may project. `name` and `modified` are always returned
+# because the cursor is built from them.
+SELECTABLE_FIELDS = (
+	"name",
+	"flow_name",
+	"source_app",
+	"target_app",
+	"status",
+	"workflow_id",
+	"last_run",
+	"error_message",
+	"modified",
+	"creation",
+)
+
+FIELD_SETS = {
+	"minimal": ["name", "flow_name", "status", "modified"],
+	"summary": ["name", "flow_name", "source_app", "target_app", "status", "last_run", "modified"],
+	"detail": ["name", "flow_name", "source_app", "target_app", "status", "workflow_id", "last_run", "error_message", "modified"],
+}
+
+COUNT_CACHE_KEY = "lodgeick:integration_count"
+
+
+def resolve_fields(fields=None, default_set: str = "summary") -> List[str]:
+	"""
+	Resolve the requested projection into a validated column list
+
+	Args:
+		fields: Field set name, comma separated string or JSON/list of column names
+		default_set: Field set used when nothing is requested
+
+	Returns:
+		List of column names (always including name and modified)
+	"""
+	if not fields:
+		fields = default_set
+
+	if isinstance(fields, str):
+		if fields in FIELD_SETS:
+			fields = FIELD_SETS[fields]
+		elif fields.startswith("["):
+			fields = json.loads(fields)
+		else:
+			fields = [f.strip() for f in fields.split(",") if f.strip()]
+
+	invalid = [f for f in fields if f not in SELECTABLE_FIELDS]
+	if invalid:
+		frappe.throw(_("Invalid fields requested: {0}").format(", ".join(invalid)))
+
+	resolved = list(dict.fromkeys(fields))
+	for required in ("name", "modified"):
+		if required not in resolved:
+			resolved.append(required)
+
+	return resolved
+
+
+def encode_cursor(row: Dict) -> str:
+	"""Build an opaque cursor from the last row of a page"""
+	payload = json.dumps([str(row["modified"]), row["name"]], separators=(",", ":"))
+	return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+	"""Decode an opaque cursor into its (modified, name) keyset position"""
+	try:
+		padded = cursor + "=" * (-len(cursor) % 4)
+		modified, name = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+		return frappe.utils.get_datetime(modified), name
+	except Exception:
+		frappe.throw(_("Invalid cursor"))
+
+
+def list_integrations_page(
+	user: str,
+	fields=None,
+	status: Optional[str] = None,
+	app: Optional[str] = None,
+	cursor: Optional[str] = None,
+	page_length=None,
+	with_total=False,
+	default_set: str = "summary",
+) -> Dict:
+	"""
+	Fetch one page of a user's integrations, newest first
+
+	Pages are ordered by (modified desc, name desc) and continued with a
+	keyset cursor, so later pages cost the same as the first one. Without a
+	cursor or page_length every matching integration is returned in one
+	response, as before pagination existed.
+
+	Args:
+		user: Owning user
+		fields: Projection (see resolve_fields)
+		status: Optional status filter
+		app: Optional app filter, matched against source_app or target_app
+		cursor: Cursor returned by the previous page
+		page_length: Page size (capped at MAX_PAGE_LENGTH; DEFAULT_PAGE_LENGTH
+			when only a cursor is given)
+		with_total: Include the total count for the filters
+		default_set: Field set used when fields is not given
+
+	Returns:
+		dict: integrations, next_cursor, has_more and optionally total
+	"""
+	columns = resolve_fields(fields, default_set)
+	paginated = bool(cursor or page_length)
+	page_length = min(max(frappe.utils.cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+
+	UserIntegration = frappe.qb.DocType("User Integration")
+	query = (
+		frappe.qb.from_(UserIntegration)
+		.select(*[UserIntegration[column] for column in columns])
+		.where(UserIntegration.user == user)
+	)
+
+	if status:
+		query = query.where(UserIntegration.status == status)
+
+	if app:
+		query = query.where((UserIntegration.source_app == app) | (UserIntegration.target_app == app))
+
+	if cursor:
+		last_modified, last_name = decode_cursor(cursor)
+		query = query.where(
+			(UserIntegration.modified < last_modified)
+			| ((UserIntegration.modified == last_modified) & (UserIntegration.name < last_name))
+		)
+
+	query = (
+		query.orderby(UserIntegration.modified, order=Order.desc)
+		.orderby(UserIntegration.name, order=Order.desc)
+	)
+	if paginated:
+		query = query.limit(page_length + 1)
+
+	rows = query.run(as_dict=True)
+	has_more = paginated and len(rows) > page_length
+	if has_more:
+		rows = rows[:page_length]
+
+	result = {
+		"integrations": rows,
+		"next_cursor": encode_cursor(rows[-1]) if has_more and rows else None,
+		"has_more": has_more,
+	}
+
+	if frappe.utils.cint(with_total):
+		result["total"] = get_integration_count(user, status=status, app=app)
+
+	return result
+
+
+def get_integration_count(user: str, status: Optional[str] = None, app: Optional[str] = None) -> int:
+	"""
+	Get the number of integrations matching the filters from the count cache
+
+	The per-user cache hash is dropped whenever one of the user's integrations
+	is created, deleted or changes status/apps, so COUNT(*) only runs once per
+	filter combination between changes.
+	"""
+	field = f"{status or '*'}|{app or '*'}"
+
+	def _count():
+		UserIntegration = frappe.qb.DocType("User Integration")
+		query = (
+			frappe.qb.from_(UserIntegration)
+			.select(Count(UserIntegration.name))
+			.where(UserIntegration.user == user)
+		)
+		if status:
+			query = query.where(UserIntegration.status == status)
+		if app:
+			query = query.where((UserIntegration.source_app == app) | (UserIntegration.target_app == app))
+		return query.run()[0][0]
+
+	return frappe.cache().hget(f"{COUNT_CACHE_KEY}:{user}", field, generator=_count)
+
+
+def invalidate_integration_counts(user: str):
+	"""Drop cached integration counts for a user"""
+	frappe.cache().delete_value(f"{COUNT_CACHE_KEY}:{user}")
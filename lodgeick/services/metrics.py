@@ -0,0 +1,86 @@
+"""
+Lightweight Metrics for Lodgeick
+Counters, gauges and timing summaries kept in a per-site Redis hash
+"""
+
+from typing import Dict, Optional
+
+import frappe
+
+
+METRICS_KEY = "lodgeick:metrics"
+
+# count, sum and max of an observation in one round trip
+OBSERVE_SCRIPT = """
+redis.call('HINCRBY', KEYS[1], ARGV[1] .. ':count', 1)
+redis.call('HINCRBYFLOAT', KEYS[1], ARGV[1] .. ':sum', ARGV[2])
+local current = redis.call('HGET', KEYS[1], ARGV[1] .. ':max')
+if not current or tonumber(current) < tonumber(ARGV[2]) then
+	redis.call('HSET', KEYS[1], ARGV[1] .. ':max', ARGV[2])
+end
+"""
+
+
+def _field(name: str, tags: Optional[Dict] = None) -> str:
+	if not tags:
+		return name
+	tag_str = ",".join(f"{key}={tags[key]}" for key in sorted(tags))
+	return f"{name}|{tag_str}"
+
+
+def _key() -> str:
+	return frappe.cache().make_key(METRICS_KEY)
+
+
+def increment(name: str, value: int = 1, tags: Optional[Dict] = None):
+	"""Increment a counter"""
+	try:
+		frappe.cache().hincrby(_key(), _field(name, tags), value)
+	except Exception:
+		# Metrics must never break the code path being measured
+		pass
+
+
+def gauge(name: str, value: float, tags: Optional[Dict] = None):
+	"""Set a gauge to its current value"""
+	try:
+		# RedisWrapper.hset pickles and re-prefixes; a pipeline writes the raw number
+		pipe = frappe.cache().pipeline()
+		pipe.hset(_key(), _field(name, tags), value)
+		pipe.execute()
+	except Exception:
+		pass
+
+
+def observe(name: str, value: float, tags: Optional[Dict] = None):
+	"""
+	Record a timing/size observation
+
+	Keeps count, sum and max so averages can be derived; use milliseconds
+	for timings.
+	"""
+	try:
+		frappe.cache().eval(OBSERVE_SCRIPT, 1, _key(), _field(name, tags), value)
+	except Exception:
+		pass
+
+
+@frappe.whitelist()
+def get_metrics() -> dict:
+	"""
+	Get all recorded metrics for the site
+
+	Returns:
+		dict: metric field -> value
+	"""
+	frappe.only_for("System Manager")
+
+	pipe = frappe.cache().pipeline()
+	pipe.hgetall(_key())
+	raw = pipe.execute()[0]
+	metrics = {}
+	for field, value in raw.items():
+		field = field.decode() if isinstance(field, bytes) else field
+		value = value.decode() if isinstance(value, bytes) else value
+		metrics[field] = float(value) if "." in value else int(value)
+	return metrics
@@ -0,0 +1,189 @@
+"""
+OAuth Provider Configuration Resolver
+Resolves provider endpoints and client credentials once and serves them
+from a process-local map backed by Redis
+"""
+
+import hashlib
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+import frappe
+from frappe.utils.password import get_decrypted_password
+
+
+# Static endpoint definitions; client credentials are merged in at resolve time
+PROVIDER_ENDPOINTS = MappingProxyType({
+	"xero": MappingProxyType({
+		"auth_url": "https://login.xero.com/identity/connect/authorize",
+		"token_url": "https://identity.xero.com/connect/token",
+		"scope": "accounting.transactions accounting.contacts offline_access"
+	}),
+	"google": MappingProxyType({
+		"auth_url": "https://accounts.google.com/o/oauth2/v2/auth",
+		"token_url": "https://oauth2.googleapis.com/token",
+		"scope": "https://www.googleapis.com/auth/gmail.readonly https://www.googleapis.com/auth/gmail.send https://www.googleapis.com/auth/spreadsheets https://www.googleapis.com/auth/drive.file"
+	}),
+	"slack": MappingProxyType({
+		"auth_url": "https://slack.com/oauth/v2/authorize",
+		"token_url": "https://slack.com/api/oauth.v2.access",
+		"scope": "channels:read channels:write chat:write"
+	}),
+	"hubspot": MappingProxyType({
+		"auth_url": "https://app.hubspot.com/oauth/authorize",
+		"token_url": "https://api.hubapi.com/oauth/v1/token",
+		"scope": "crm.objects.contacts.read crm.objects.contacts.write"
+	}),
+})
+
+SETTINGS_DOCTYPE = "OAuth Credentials Settings"
+
+# Bump when the shape of a resolved config changes so cached maps are rebuilt
+CONFIG_VERSION = 2
+
+CACHE_KEY = "lodgeick:oauth_provider_config"
+GENERATION_KEY = "lodgeick:oauth_provider_config_generation"
+FINGERPRINT_FIELD = "__conf_fingerprint__"
+
+# site -> (generation, conf fingerprint, immutable provider map)
+_process_cache = {}
+
+
+def get_provider_config(provider: str) -> Optional[Mapping]:
+	"""
+	Get the resolved OAuth configuration for a provider
+
+	Args:
+		provider: Provider name
+
+	Returns:
+		Read-only mapping with provider, auth_url, token_url, scope, client_id
+		and client_secret, or None if the provider is unknown
+	"""
+	return get_provider_config_map().get(provider)
+
+
+def get_provider_config_map() -> Mapping:
+	"""
+	Get the immutable provider -> config map for the current site
+
+	Lookup order is process memory, then Redis, then OAuth Credentials
+	Settings + site config. The process copy is reused until the Redis
+	generation or the site config credentials change.
+	"""
+	site = frappe.local.site
+	generation = frappe.cache().get_value(GENERATION_KEY)
+	fingerprint = _conf_fingerprint()
+
+	cached = _process_cache.get(site)
+	if cached and cached[0] == generation and cached[1] == fingerprint:
+		return cached[2]
+
+	configs = frappe.cache().hgetall(CACHE_KEY)
+	if not configs or configs.pop(FINGERPRINT_FIELD, None) != fingerprint:
+		configs = _load_provider_configs()
+		_store_provider_configs(configs, fingerprint)
+		if generation is None:
+			generation = _bump_generation()
+
+	provider_map = MappingProxyType({
+		provider: MappingProxyType(config) for provider, config in configs.items()
+	})
+	_process_cache[site] = (generation, fingerprint, provider_map)
+	return provider_map
+
+
+def invalidate_provider_configs(doc=None, method=None):
+	"""Drop cached provider configs for the site (all processes)"""
+	frappe.cache().delete_value(CACHE_KEY)
+	_bump_generation()
+	_process_cache.pop(frappe.local.site, None)
+
+
+def invalidate_provider_config(provider: str):
+	"""
+	Re-resolve a single provider after its credentials change
+
+	Only that provider's entry in the shared Redis map is rewritten; other
+	processes pick it up on their next lookup via the generation bump.
+	"""
+	cache = frappe.cache()
+	if cache.hget(CACHE_KEY, FINGERPRINT_FIELD) is not None:
+		config = _load_provider_configs([provider]).get(provider)
+		if config:
+			cache.hset(CACHE_KEY, provider, config)
+		else:
+			cache.hdel(CACHE_KEY, provider)
+
+	_bump_generation()
+	_process_cache.pop(frappe.local.site, None)
+
+
+def _bump_generation() -> str:
+	generation = frappe.generate_hash(length=10)
+	frappe.cache().set_value(GENERATION_KEY, generation)
+	return generation
+
+
+def _store_provider_configs(configs: Dict, fingerprint: str):
+	cache = frappe.cache()
+	cache.delete_value(CACHE_KEY)
+	for provider, config in configs.items():
+		cache.hset(CACHE_KEY, provider, config)
+	cache.hset(CACHE_KEY, FINGERPRINT_FIELD, fingerprint)
+
+
+def _conf_fingerprint() -> str:
+	"""Hash of the site config credentials, so a config reload is noticed"""
+	values = [str(CONFIG_VERSION)]
+	for provider in PROVIDER_ENDPOINTS:
+		values.append(frappe.conf.get(f"{provider}_client_id") or "")
+		values.append(frappe.conf.get(f"{provider}_client_secret") or "")
+	return hashlib.sha1("\0".join(values).encode()).hexdigest()
+
+
+def _load_provider_configs(providers: Optional[List[str]] = None) -> Dict[str, Dict]:
+	"""
+	Resolve providers from OAuth Credentials Settings, falling back to site config
+
+	Args:
+		providers: Only resolve these providers (default: every known provider)
+	"""
+	configs = {}
+
+	filters = {"parent": SETTINGS_DOCTYPE, "parenttype": SETTINGS_DOCTYPE}
+	if providers is not None:
+		filters["provider"] = ["in", providers]
+
+	try:
+		credentials = frappe.get_all(
+			"OAuth Credential",
+			filters=filters,
+			fields=["name", "provider", "client_id"],
+			order_by="idx asc"
+		)
+		for cred in credentials:
+			if cred.provider in configs:
+				continue
+			client_secret = get_decrypted_password(
+				"OAuth Credential", cred.name, "client_secret", raise_exception=False
+			)
+			if cred.client_id and client_secret:
+				config = dict(PROVIDER_ENDPOINTS.get(cred.provider, {}))
+				config["provider"] = cred.provider
+				config["client_id"] = cred.client_id
+				config["client_secret"] = client_secret
+				configs[cred.provider] = config
+	except Exception as e:
+		frappe.log_error(f"Error getting provider config from settings: {str(e)}")
+
+	for provider, endpoints in PROVIDER_ENDPOINTS.items():
+		if provider in configs or (providers is not None and provider not in providers):
+			continue
+		config = dict(endpoints)
+		config["provider"] = provider
+		config["client_id"] = frappe.conf.get(f"{provider}_client_id")
+		config["client_secret"] = frappe.conf.get(f"{provider}_client_secret")
+		configs[provider] = config
+
+	return configs
@@ -0,0 +1,157 @@
+"""
+Pooled HTTP Sessions for OAuth Providers
+One keep-alive session per provider with timeouts and transient-error
+retries, shared by the OAuth callback, manual refresh and background refresh
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import frappe
+import requests
+from frappe import _
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lodgeick.services import metrics
+
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+DEFAULT_POOL_SIZE = 10
+
+# Statuses that mean the provider did not process the grant. 500, 502 and
+# 504 are left out: the grant may have gone through, and re-sending a
+# consumed authorization code or a rotated refresh token (Xero) fails and
+# can disconnect the user
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+
+# Longest Retry-After honoured before a retry, so a request has a known
+# upper bound (see get_max_request_seconds)
+MAX_RETRY_AFTER = 10
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_provider_session(provider: str) -> requests.Session:
+	"""
+	Get the process-wide pooled session for a provider
+
+	Sessions are created lazily and reused across requests and threads, so
+	repeat calls to the same token endpoint skip the TCP/TLS handshake.
+	"""
+	session = _sessions.get(provider)
+	if session is not None:
+		return session
+
+	with _sessions_lock:
+		session = _sessions.get(provider)
+		if session is None:
+			session = _build_session()
+			_sessions[provider] = session
+		return session
+
+
+class _BoundedRetry(Retry):
+	"""Retry that waits at most MAX_RETRY_AFTER seconds for Retry-After"""
+
+	def get_retry_after(self, response):
+		retry_after = super().get_retry_after(response)
+		if retry_after is None:
+			return None
+		return min(retry_after, MAX_RETRY_AFTER)
+
+
+def _build_session() -> requests.Session:
+	retry = _BoundedRetry(
+		total=MAX_RETRIES,
+		connect=MAX_RETRIES,
+		read=0,
+		status=MAX_RETRIES,
+		backoff_factor=BACKOFF_FACTOR,
+		status_forcelist=RETRY_STATUSES,
+		allowed_methods=frozenset(["GET", "POST"]),
+		respect_retry_after_header=True,
+		raise_on_status=False
+	)
+	adapter = HTTPAdapter(
+		pool_connections=DEFAULT_POOL_SIZE,
+		pool_maxsize=DEFAULT_POOL_SIZE,
+		max_retries=retry
+	)
+
+	session = requests.Session()
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	return session
+
+
+def get_timeout(timeout_conf: Optional[Dict] = None) -> tuple:
+	"""(connect, read) timeout from site config oauth_http_timeout"""
+	timeout_conf = timeout_conf or {}
+	return (
+		timeout_conf.get("connect", DEFAULT_CONNECT_TIMEOUT),
+		timeout_conf.get("read", DEFAULT_READ_TIMEOUT)
+	)
+
+
+def get_max_request_seconds(timeout: tuple = None) -> float:
+	"""
+	Upper bound on one token request, retries included
+
+	Every attempt may use the full connect and read timeouts, and every
+	retry may first wait for the longest Retry-After or backoff.
+	"""
+	connect, read = timeout or (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+	longest_wait = max(MAX_RETRY_AFTER, BACKOFF_FACTOR * 2 ** (MAX_RETRIES - 1))
+	return (MAX_RETRIES + 1) * (connect + read) + MAX_RETRIES * longest_wait
+
+
+def post_token_request(provider: str, token_url: str, data: Dict, timeout: tuple = None) -> requests.Response:
+	"""
+	POST a grant to a provider's token endpoint over the pooled session
+
+	Does not touch frappe state, so it is safe to call from worker threads;
+	resolve the timeout with get_timeout() on the calling thread and record
+	the outcome with record_token_request().
+	"""
+	return get_provider_session(provider).post(
+		token_url,
+		data=data,
+		timeout=timeout or (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+	)
+
+
+def record_token_request(provider: str, elapsed_ms: float, response: requests.Response = None, error: Exception = None):
+	"""Record latency and outcome of a token endpoint call"""
+	tags = {"provider": provider}
+	metrics.observe("oauth.token_request_ms", elapsed_ms, tags)
+
+	if error is not None:
+		metrics.increment("oauth.token_request_errors", 1, {**tags, "error": error.__class__.__name__})
+	elif response is not None:
+		metrics.increment("oauth.token_request_status", 1, {**tags, "status": response.status_code})
+
+
+def token_request(provider: str, token_url: str, data: Dict) -> requests.Response:
+	"""
+	POST to a token endpoint with timeouts, retries and metrics
+
+	Raises a frappe error if the provider cannot be reached in time.
+	"""
+	timeout = get_timeout(frappe.conf.get("oauth_http_timeout"))
+	started = time.monotonic()
+
+	try:
+		response = post_token_request(provider, token_url, data, timeout)
+	except requests.exceptions.RequestException as e:
+		record_token_request(provider, (time.monotonic() - started) * 1000, error=e)
+		frappe.log_error(f"Token request to {provider} failed: {str(e)}", "OAuth HTTP Error")
+		frappe.throw(_("Could not reach {0} to complete authentication. Please try again.").format(provider))
+
+	record_token_request(provider, (time.monotonic() - started) * 1000, response=response)
+	return response
@@ -0,0 +1,415 @@
+"""
+Redis Rate Limiter for Shared OAuth Apps
+Sliding-window counters evaluated and consumed atomically in one Lua call,
+driven by the rate_limits in OAUTH_TIER_CONFIG
+"""
+
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import frappe
+
+from lodgeick.config.oauth_tiers import get_rate_limit
+
+
+KEY_PREFIX = "lodgeick:{rate_limit}"
+
+# Limiters counted since the last flush to OAuth Usage Log, and the set a
+# running flush is working from (kept until its DB commit succeeds)
+DIRTY_KEY = "lodgeick:{rate_limit}:dirty"
+FLUSHING_KEY = "lodgeick:{rate_limit}:flushing"
+MEMBER_SEPARATOR = "\x1f"
+
+# Request history: per-minute hashes kept for a day and per-day hashes kept
+# until rolled up into OAuth Usage Daily, both member -> requests
+HISTORY_PREFIX = "lodgeick:{rate_limit}:usage_history"
+
+# Every key above shares the {rate_limit} hash tag, so the scripts below,
+# which touch a limiter, the dirty set and the history in one call, map to
+# a single Redis Cluster slot
+
+# Counter windows mirrored into OAuth Usage Log
+DAY_WINDOW = 86400
+MINUTE_WINDOW = 60
+
+# Seconds per unit for "requests_per_<n>_<unit>" / "requests_per_<unit>" keys
+WINDOW_UNITS = {
+	"second": 1,
+	"seconds": 1,
+	"minute": 60,
+	"minutes": 60,
+	"hour": 3600,
+	"hours": 3600,
+	"day": 86400,
+	"days": 86400,
+}
+LIMIT_KEY_PATTERN = re.compile(r"^requests_per_(?:(\d+)_)?([a-z]+)$")
+
+# A limiter is one hash: a "<window_seconds>" field per window holding
+# "<bucket>,<current count>,<previous bucket's count>", and "last" holding
+# the unix time of the last counted request. Returns the (current,
+# previous) counts as seen from `bucket`.
+LOAD_WINDOW_LUA = """
+local function load_window(key, window, bucket)
+	local state = redis.call('HGET', key, window)
+	if not state then
+		return 0, 0
+	end
+	local stored, current, previous = string.match(state, '^(%-?%d+),(%d+),(%d+)$')
+	stored = tonumber(stored)
+	if stored == bucket then
+		return tonumber(current), tonumber(previous)
+	elseif stored == bucket - 1 then
+		return 0, tonumber(current)
+	end
+	return 0, 0
+end
+"""
+
+# Sliding-window counter: the previous fixed window is weighted by how much
+# of it still overlaps the sliding window. Every window must admit the
+# request before any counter is touched, so check-and-consume is atomic.
+#
+# Counted requests are also added to the minute and day history hashes in
+# the same call, so history costs no extra round trip. The history buckets
+# are picked by the caller's clock, as a script may only use declared keys.
+#
+# KEYS: limiter, dirty set, minute history, day history
+# ARGV: cost, mode ('peek' | 'consume' | 'record'), dirty set member, then
+#       (window_seconds, limit) pairs
+# Returns: {allowed, retry_after_seconds, remaining_1, ..., remaining_n,
+#          time seconds, time microseconds, previous last or ''}; the last
+#          three let refund() undo exactly what was counted
+SLIDING_WINDOW_SCRIPT = LOAD_WINDOW_LUA + """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local mode = ARGV[2]
+local first = 4
+local windows = (#ARGV - first + 1) / 2
+
+local allowed = 1
+local retry_after = 0
+local result = {}
+local states = {}
+local previous_last = ''
+local longest = 0
+
+for i = 0, windows - 1 do
+	local window = tonumber(ARGV[first + i * 2])
+	local limit = tonumber(ARGV[first + 1 + i * 2])
+	local bucket = math.floor(now / window)
+	local current, previous = load_window(KEYS[1], window, bucket)
+	local elapsed = (now - bucket * window) / window
+	local estimated = previous * (1 - elapsed) + current
+
+	states[i + 1] = {window, bucket, current, previous}
+	result[i + 3] = math.max(0, math.floor(limit - estimated))
+	longest = math.max(longest, window)
+
+	if estimated + cost > limit then
+		allowed = 0
+		local wait
+		if current + cost > limit then
+			-- wait for this window to roll over and decay enough as "previous"
+			local until_rollover = (bucket + 1) * window - now
+			if limit - cost < 0 or current <= 0 then
+				wait = until_rollover + window
+			else
+				wait = until_rollover + window * (1 - (limit - cost) / current)
+			end
+		else
+			-- the previous window's share has to decay below the headroom
+			local decay_to = 1 - (limit - current - cost) / previous
+			wait = (decay_to - elapsed) * window
+		end
+		if wait > retry_after then
+			retry_after = wait
+		end
+	end
+end
+
+if mode == 'record' or (mode == 'consume' and allowed == 1) then
+	for i, state in ipairs(states) do
+		redis.call('HSET', KEYS[1], state[1], state[2] .. ',' .. (state[3] + cost) .. ',' .. state[4])
+		result[i + 2] = math.max(0, result[i + 2] - cost)
+	end
+	previous_last = redis.call('HGET', KEYS[1], 'last') or ''
+	redis.call('HSET', KEYS[1], 'last', t[1])
+	redis.call('EXPIRE', KEYS[1], math.max(longest * 2 + 1, 2 * 86400))
+	redis.call('SADD', KEYS[2], ARGV[3])
+
+	redis.call('HINCRBY', KEYS[3], ARGV[3], cost)
+	redis.call('EXPIRE', KEYS[3], 86400 + 120)
+	redis.call('HINCRBY', KEYS[4], ARGV[3], cost)
+	redis.call('EXPIRE', KEYS[4], 3 * 86400)
+end
+
+result[1] = allowed
+result[2] = tostring(retry_after)
+result[windows + 3] = t[1]
+result[windows + 4] = t[2]
+result[windows + 5] = previous_last
+return result
+"""
+
+
+def get_window_limits(provider: str, tier: str, api_name: Optional[str] = None) -> List[Tuple[int, int]]:
+	"""
+	Translate a tier's rate_limits into (window_seconds, limit) pairs
+
+	Args:
+		provider: Provider name
+		tier: Tier name
+		api_name: Optional API for per-API limits
+
+	Returns:
+		List of (window_seconds, limit), empty if the tier is unlimited
+	"""
+	return parse_window_limits(get_rate_limit(provider, tier, api_name))
+
+
+def parse_window_limits(rate_config: Optional[Dict]) -> List[Tuple[int, int]]:
+	"""(window_seconds, limit) pairs from a "requests_per_<window>" config dict"""
+	if not rate_config:
+		return []
+
+	windows = []
+	for key, limit in rate_config.items():
+		match = LIMIT_KEY_PATTERN.match(key)
+		if not match or not isinstance(limit, int):
+			continue
+		unit = WINDOW_UNITS.get(match.group(2))
+		if not unit:
+			continue
+		windows.append((int(match.group(1) or 1) * unit, limit))
+
+	return sorted(windows)
+
+
+def rate_limit_key(user: str, provider: str, tier: str, api_name: Optional[str] = None) -> str:
+	"""Redis hash holding one (user, provider, tier, api) limiter"""
+	return frappe.cache().make_key(f"{KEY_PREFIX}:{user}:{provider}:{tier}:{api_name or ''}")
+
+
+def history_key(resolution: str, bucket: int) -> str:
+	"""Redis hash of per-member request counts for one 'minute' or 'day' bucket"""
+	return frappe.cache().make_key(f"{HISTORY_PREFIX}:{resolution}:{bucket}")
+
+
+def evaluate(
+	user: str,
+	provider: str,
+	tier: str,
+	api_name: Optional[str] = None,
+	cost: int = 1,
+	mode: str = "consume",
+) -> Dict:
+	"""
+	Check (and optionally consume) a user's rate limit in one Redis round trip
+
+	Args:
+		user: User
+		provider: Provider name
+		tier: Tier name
+		api_name: Optional API name
+		cost: Requests to count
+		mode: 'peek' (check only), 'consume' (count only if allowed) or
+			'record' (always count)
+
+	Returns:
+		dict: allowed, retry_after (seconds), remaining per window size and
+		counted (what to pass to refund(), None if nothing was counted)
+	"""
+	windows = get_window_limits(provider, tier, api_name)
+	if not windows:
+		return {"allowed": True, "retry_after": 0, "remaining": {}, "limited": False, "counted": None}
+
+	now = int(time.time())
+	keys = [
+		rate_limit_key(user, provider, tier, api_name),
+		frappe.cache().make_key(DIRTY_KEY),
+		history_key("minute", now // MINUTE_WINDOW * MINUTE_WINDOW),
+		history_key("day", now // DAY_WINDOW * DAY_WINDOW),
+	]
+	args = [cost, mode, MEMBER_SEPARATOR.join([user, provider, tier, api_name or ""])]
+	for window, limit in windows:
+		args.extend([window, limit])
+
+	script = frappe.cache().register_script(SLIDING_WINDOW_SCRIPT)
+	result = script(keys=keys, args=args)
+	allowed = bool(int(result[0]))
+
+	counted = None
+	if mode == "record" or (mode == "consume" and allowed):
+		seconds, microseconds, previous_last = result[len(windows) + 2:]
+		counted = {
+			"cost": cost,
+			"time": [frappe.safe_decode(seconds), frappe.safe_decode(microseconds)],
+			"previous_last": frappe.safe_decode(previous_last),
+			"history": keys[2:]
+		}
+
+	return {
+		"allowed": allowed,
+		"retry_after": float(result[1]),
+		"remaining": {window: int(remaining) for (window, _), remaining in zip(windows, result[2:])},
+		"limited": True,
+		"counted": counted
+	}
+
+
+def check_and_consume(user: str, provider: str, tier: str, api_name: Optional[str] = None, cost: int = 1) -> Dict:
+	"""Atomically admit and count a request if every window allows it"""
+	return evaluate(user, provider, tier, api_name, cost, "consume")
+
+
+def refund(user: str, provider: str, tier: str, api_name: Optional[str] = None, counted: Optional[Dict] = None):
+	"""
+	Give back a consumed request that was then rejected by another limit
+
+	Undoes the window counters, the history buckets and the last request
+	time written by the evaluate() call that returned `counted`.
+	"""
+	windows = get_window_limits(provider, tier, api_name)
+	if not windows or not counted:
+		return
+
+	keys = [rate_limit_key(user, provider, tier, api_name), *counted["history"]]
+	args = [
+		counted["cost"],
+		*counted["time"],
+		counted["previous_last"],
+		MEMBER_SEPARATOR.join([user, provider, tier, api_name or ""]),
+	]
+	args.extend(window for window, _ in windows)
+
+	script = frappe.cache().register_script(REFUND_SCRIPT)
+	script(keys=keys, args=args)
+
+
+# KEYS: limiter, minute history, day history (as used by the counting call)
+# ARGV: cost, counted time seconds, microseconds, previous last, history
+#       member, then window sizes.
+# Uses the time the request was counted at, so buckets match even if a
+# window rolled over in between; never takes a counter below zero.
+REFUND_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local now = tonumber(ARGV[2]) + tonumber(ARGV[3]) / 1000000
+
+local function decrement_field(key, field)
+	local current = tonumber(redis.call('HGET', key, field) or '0')
+	if current > cost then
+		redis.call('HINCRBY', key, field, -cost)
+	elseif current > 0 then
+		redis.call('HDEL', key, field)
+	end
+end
+
+for i = 6, #ARGV do
+	local window = tonumber(ARGV[i])
+	local counted_bucket = math.floor(now / window)
+	local state = redis.call('HGET', KEYS[1], window)
+	if state then
+		local bucket, current, previous = string.match(state, '^(%-?%d+),(%d+),(%d+)$')
+		bucket, current, previous = tonumber(bucket), tonumber(current), tonumber(previous)
+		-- the counted bucket is either still current or has become previous
+		if bucket == counted_bucket then
+			current = current - math.min(cost, current)
+		elseif bucket == counted_bucket + 1 then
+			previous = previous - math.min(cost, previous)
+		end
+		redis.call('HSET', KEYS[1], window, bucket .. ',' .. current .. ',' .. previous)
+	end
+end
+
+decrement_field(KEYS[2], ARGV[5])
+decrement_field(KEYS[3], ARGV[5])
+
+-- Restore the last request time unless a newer request has set it since
+if redis.call('HGET', KEYS[1], 'last') == ARGV[2] then
+	if ARGV[4] == '' then
+		redis.call('HDEL', KEYS[1], 'last')
+	else
+		redis.call('HSET', KEYS[1], 'last', ARGV[4])
+	end
+end
+return 1
+"""
+
+
+# Moves newly dirtied limiters into the flushing set and returns all of it;
+# members left over from a flush that never committed are picked up again
+TAKE_DIRTY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+	redis.call('SUNIONSTORE', KEYS[2], KEYS[2], KEYS[1])
+	redis.call('DEL', KEYS[1])
+end
+return redis.call('SMEMBERS', KEYS[2])
+"""
+
+# KEYS: limiters; ARGV: day window, minute window
+# Returns: {now, day_count_1, minute_count_1, last_request_1, ...}
+READ_COUNTERS_SCRIPT = LOAD_WINDOW_LUA + """
+local now = tonumber(redis.call('TIME')[1])
+local day = tonumber(ARGV[1])
+local minute = tonumber(ARGV[2])
+local result = {tostring(now)}
+for _, key in ipairs(KEYS) do
+	local today = load_window(key, day, math.floor(now / day))
+	local this_minute = load_window(key, minute, math.floor(now / minute))
+	table.insert(result, tostring(today))
+	table.insert(result, tostring(this_minute))
+	table.insert(result, redis.call('HGET', key, 'last') or '')
+end
+return result
+"""
+
+
+def take_dirty_limiters() -> List[Tuple[str, str, str, str]]:
+	"""
+	Claim the limiters counted since the last flush
+
+	The claimed set stays in Redis until ack_dirty_limiters() is called, so
+	a flush that dies before committing is retried by the next one.
+
+	Returns:
+		List of (user, provider, tier, api_name)
+	"""
+	cache = frappe.cache()
+	script = cache.register_script(TAKE_DIRTY_SCRIPT)
+	members = script(keys=[cache.make_key(DIRTY_KEY), cache.make_key(FLUSHING_KEY)], args=[])
+	return [tuple(frappe.safe_decode(member).split(MEMBER_SEPARATOR)) for member in members]
+
+
+def ack_dirty_limiters():
+	"""Forget the claimed limiters once their counts are committed"""
+	frappe.cache().delete(frappe.cache().make_key(FLUSHING_KEY))
+
+
+def read_counters(limiters: List[Tuple[str, str, str, str]]) -> Tuple[int, List[Dict]]:
+	"""
+	Read the current day/minute counts of many limiters in one round trip
+
+	Args:
+		limiters: (user, provider, tier, api_name) tuples
+
+	Returns:
+		(redis_now, [{"requests_today", "requests_this_minute", "last_request"}])
+		with last_request as a unix timestamp or None
+	"""
+	keys = [rate_limit_key(*limiter) for limiter in limiters]
+	script = frappe.cache().register_script(READ_COUNTERS_SCRIPT)
+	result = script(keys=keys, args=[DAY_WINDOW, MINUTE_WINDOW])
+
+	counters = []
+	for i in range(1, len(result), 3):
+		last = frappe.safe_decode(result[i + 2])
+		counters.append({
+			"requests_today": int(result[i]),
+			"requests_this_minute": int(result[i + 1]),
+			"last_request": int(last) if last else None
+		})
+
+	return int(result[0]), counters
@@ -0,0 +1,60 @@
+"""
+Realtime Events for Lodgeick
+Pushes integration changes to the owning user's open dashboards
+"""
+
+import frappe
+from typing import Any, Dict, Optional
+
+
+INTEGRATION_EVENT = "lodgeick_integration_update"
+CONNECTION_EVENT = "lodgeick_oauth_connection"
+
+
+def publish_integration_update(integration_doc: Any, kind: str = "status", data: Optional[Dict] = None):
+	"""
+	Publish an integration change to its owner over Frappe's realtime channel
+
+	Events are sent after the current transaction commits, so listeners never
+	see a state that was rolled back.
+
+	Args:
+		integration_doc: User Integration document
+		kind: Event kind ('status', 'execution' or 'deleted')
+		data: Extra payload merged into the event
+	"""
+	message = {
+		"kind": kind,
+		"integration_id": integration_doc.name,
+		"status": integration_doc.status,
+		"last_run": str(integration_doc.last_run) if integration_doc.last_run else None,
+		"error_message": integration_doc.error_message,
+	}
+
+	if data:
+		message.update(data)
+
+	frappe.publish_realtime(
+		INTEGRATION_EVENT,
+		message=message,
+		user=integration_doc.user,
+		after_commit=True
+	)
+
+
+def publish_connection_progress(user: str, provider: str, stage: str, message: Optional[str] = None, **data):
+	"""
+	Publish progress of the background work that follows an OAuth connection
+
+	Args:
+		user: User who connected the provider
+		provider: Provider name
+		stage: 'connected', 'settings', 'n8n', 'done' or 'error'
+		message: Optional human-readable detail
+	"""
+	frappe.publish_realtime(
+		CONNECTION_EVENT,
+		message={"provider": provider, "stage": stage, "message": message, **data},
+		user=user,
+		after_commit=True
+	)
@@ -0,0 +1,270 @@
+"""
+Shared OAuth App Quota
+Caps each shared (default tier) OAuth app per API across all users and
+divides it into weighted fair shares among the users active right now
+"""
+
+from typing import Dict, Optional
+
+import frappe
+
+from lodgeick.config.oauth_tiers import get_shared_quota
+from lodgeick.services.rate_limiter import parse_window_limits
+
+
+KEY_PREFIX = "lodgeick:shared_quota"
+
+# A user counts towards the fair-share split for this long after a request
+DEFAULT_ACTIVE_SECONDS = 120
+
+# Each window is a sliding-window counter, kept both for the whole app and
+# per user. A user within their fair share is admitted while the app has
+# headroom. Above it, they may borrow capacity only if what is left still
+# covers the unused share of every other active user, so a busy user soaks
+# up idle capacity without starving anyone.
+#
+# Counters live in one hash as "app:<window>" and "user:<user>:<window>"
+# fields holding "<bucket>,<current>,<previous>". A user's fields are
+# dropped once they have not been counted for two of the longest window.
+#
+# KEYS: active users (zset), user weights, counters, last counted (zset)
+# ARGV: user, weight, cost, mode ('peek' | 'consume' | 'record'), active
+#       seconds, then (window_seconds, limit) pairs
+# Returns: {allowed, retry_after_seconds, reason, then per window:
+#           global_remaining, fair_share, user_used}
+FAIR_SHARE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local user = ARGV[1]
+local weight = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local mode = ARGV[4]
+local active_seconds = tonumber(ARGV[5])
+local first = 6
+local windows = (#ARGV - first + 1) / 2
+
+local active_key = KEYS[1]
+local weights_key = KEYS[2]
+local counts_key = KEYS[3]
+local counted_key = KEYS[4]
+
+local longest = 0
+for i = 0, windows - 1 do
+	longest = math.max(longest, tonumber(ARGV[first + i * 2]))
+end
+
+local function window_state(field, window)
+	local bucket = math.floor(now / window)
+	local current, previous = 0, 0
+	local state = redis.call('HGET', counts_key, field)
+	if state then
+		local stored, stored_current, stored_previous = string.match(state, '^(%-?%d+),(%d+),(%d+)$')
+		stored = tonumber(stored)
+		if stored == bucket then
+			current, previous = tonumber(stored_current), tonumber(stored_previous)
+		elseif stored == bucket - 1 then
+			previous = tonumber(stored_current)
+		end
+	end
+	local elapsed = (now - bucket * window) / window
+	return {
+		field = field,
+		bucket = bucket,
+		current = current,
+		previous = previous,
+		elapsed = elapsed,
+		estimated = previous * (1 - elapsed) + current
+	}
+end
+
+-- seconds until the sliding estimate leaves room for cost under limit
+local function wait_until_fits(state, window, limit)
+	if state.estimated + cost <= limit then
+		return 0
+	end
+	if state.current + cost > limit then
+		local until_rollover = (state.bucket + 1) * window - now
+		if limit - cost < 0 or state.current <= 0 then
+			return until_rollover + window
+		end
+		return until_rollover + window * (1 - (limit - cost) / state.current)
+	end
+	return (1 - (limit - state.current - cost) / state.previous - state.elapsed) * window
+end
+
+local stale = redis.call('ZRANGEBYSCORE', active_key, '-inf', now - active_seconds)
+if #stale > 0 then
+	redis.call('ZREM', active_key, unpack(stale))
+	redis.call('HDEL', weights_key, unpack(stale))
+end
+
+local expired = redis.call('ZRANGEBYSCORE', counted_key, '-inf', now - longest * 2)
+for _, member in ipairs(expired) do
+	for i = 0, windows - 1 do
+		redis.call('HDEL', counts_key, 'user:' .. member .. ':' .. ARGV[first + i * 2])
+	end
+	redis.call('ZREM', counted_key, member)
+end
+
+-- Only requests make a user active; a peek is evaluated as if the user
+-- were active without shrinking anyone else's share
+if mode ~= 'peek' then
+	redis.call('ZADD', active_key, now, user)
+	redis.call('HSET', weights_key, user, weight)
+	redis.call('EXPIRE', active_key, active_seconds * 2)
+	redis.call('EXPIRE', weights_key, active_seconds * 2)
+end
+
+local members = redis.call('ZRANGE', active_key, 0, -1)
+local member_weights = {}
+if #members > 0 then
+	member_weights = redis.call('HMGET', weights_key, unpack(members))
+end
+local is_member = false
+local total_weight = 0
+for i = 1, #members do
+	if members[i] == user then
+		is_member = true
+		member_weights[i] = weight
+	end
+	member_weights[i] = tonumber(member_weights[i]) or 1
+	total_weight = total_weight + member_weights[i]
+end
+if not is_member then
+	table.insert(members, user)
+	table.insert(member_weights, weight)
+	total_weight = total_weight + weight
+end
+
+local allowed = 1
+local retry_after = 0
+local reason = ''
+local result = {}
+local counted = {}
+
+for i = 0, windows - 1 do
+	local window = tonumber(ARGV[first + i * 2])
+	local limit = tonumber(ARGV[first + 1 + i * 2])
+	local share = limit * weight / total_weight
+	local app = window_state('app:' .. window, window)
+	local mine = window_state('user:' .. user .. ':' .. window, window)
+	local wait = 0
+
+	if app.estimated + cost > limit then
+		reason = 'quota'
+		wait = wait_until_fits(app, window, limit)
+		if mine.estimated + cost > share then
+			wait = math.max(wait, wait_until_fits(mine, window, share))
+		end
+	elseif mine.estimated + cost > share then
+		local reserved = 0
+		for j, member in ipairs(members) do
+			if member ~= user then
+				local other = window_state('user:' .. member .. ':' .. window, window)
+				reserved = reserved + math.max(0, limit * member_weights[j] / total_weight - other.estimated)
+			end
+		end
+		if app.estimated + cost + reserved > limit then
+			if reason == '' then
+				reason = 'fair_share'
+			end
+			wait = wait_until_fits(mine, window, share)
+		end
+	end
+
+	if wait > 0 then
+		allowed = 0
+		retry_after = math.max(retry_after, wait)
+	end
+
+	table.insert(counted, {app, mine})
+	table.insert(result, math.max(0, math.floor(limit - app.estimated)))
+	table.insert(result, math.floor(share))
+	table.insert(result, math.ceil(mine.estimated))
+end
+
+if mode == 'record' or (mode == 'consume' and allowed == 1) then
+	for i, entry in ipairs(counted) do
+		for _, state in ipairs(entry) do
+			redis.call('HSET', counts_key, state.field, state.bucket .. ',' .. (state.current + cost) .. ',' .. state.previous)
+		end
+		result[(i - 1) * 3 + 1] = math.max(0, result[(i - 1) * 3 + 1] - cost)
+		result[(i - 1) * 3 + 3] = result[(i - 1) * 3 + 3] + cost
+	end
+	redis.call('ZADD', counted_key, now, user)
+	redis.call('EXPIRE', counts_key, longest * 2 + 1)
+	redis.call('EXPIRE', counted_key, longest * 2 + 1)
+end
+
+table.insert(result, 1, reason)
+table.insert(result, 1, tostring(retry_after))
+table.insert(result, 1, allowed)
+return result
+"""
+
+
+def get_user_weight(user: str) -> float:
+	"""Fair-share weight of a user from site config shared_quota_weights (default 1)"""
+	weights = frappe.conf.get("shared_quota_weights") or {}
+	return float(weights.get(user, 1))
+
+
+def evaluate(
+	user: str,
+	provider: str,
+	api_name: Optional[str] = None,
+	cost: int = 1,
+	mode: str = "consume",
+) -> Dict:
+	"""
+	Check (and optionally consume) the shared app quota for a user
+
+	Args:
+		user: User making the request
+		provider: Provider name
+		api_name: Optional API name
+		cost: Requests to count
+		mode: 'peek', 'consume' or 'record' as in rate_limiter.evaluate()
+
+	Returns:
+		dict: allowed, retry_after (seconds), reason ('quota' when the app is
+		exhausted, 'fair_share' when the user may not borrow more) and per
+		window size: global_remaining, fair_share and used
+	"""
+	windows = parse_window_limits(get_shared_quota(provider, api_name))
+	if not windows:
+		return {"allowed": True, "retry_after": 0, "reason": None, "windows": {}, "limited": False}
+
+	# One hash tag per (provider, api) keeps every key of the script on one
+	# Redis Cluster slot
+	prefix = frappe.cache().make_key(f"{KEY_PREFIX}:{{{provider}:{api_name or ''}}}")
+	keys = [f"{prefix}:active", f"{prefix}:weights", f"{prefix}:counts", f"{prefix}:counted"]
+	args = [
+		user,
+		get_user_weight(user),
+		cost,
+		mode,
+		frappe.conf.get("shared_quota_active_seconds") or DEFAULT_ACTIVE_SECONDS,
+	]
+	for window, limit in windows:
+		args.extend([window, limit])
+
+	script = frappe.cache().register_script(FAIR_SHARE_SCRIPT)
+	result = script(keys=keys, args=args)
+
+	window_stats = {}
+	for index, (window, _) in enumerate(windows):
+		offset = 3 + index * 3
+		window_stats[window] = {
+			"global_remaining": int(result[offset]),
+			"fair_share": int(result[offset + 1]),
+			"used": int(result[offset + 2])
+		}
+
+	return {
+		"allowed": bool(int(result[0])),
+		"retry_after": float(result[1]),
+		"reason": frappe.safe_decode(result[2]) or None,
+		"windows": window_stats,
+		"limited": True
+	}
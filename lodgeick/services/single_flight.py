@@ -0,0 +1,157 @@
+"""
+Distributed Single-Flight for Lodgeick
+Collapses concurrent calls for the same key, across workers, into one
+execution whose result is shared with every waiting caller
+"""
+
+import json
+import time
+from typing import Any, Callable, Optional
+
+import frappe
+from frappe import _
+
+
+LOCK_PREFIX = "lodgeick:single_flight:lock:"
+RESULT_PREFIX = "lodgeick:single_flight:result:"
+
+# Delete the lock only if we still own it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+	return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def acquire_lock(key: str, ttl: int = 30) -> Optional[str]:
+	"""
+	Try to take the lock for a key without waiting
+
+	Args:
+		key: Flight key
+		ttl: Seconds before the lock expires if the owner dies
+
+	Returns:
+		Owner token if acquired, otherwise None
+	"""
+	token = frappe.generate_hash(length=16)
+	if frappe.cache().set(_lock_key(key), token, nx=True, ex=ttl):
+		return token
+	return None
+
+
+def release_lock(key: str, token: str):
+	"""Release a lock taken with acquire_lock"""
+	frappe.cache().eval(RELEASE_SCRIPT, 1, _lock_key(key), token)
+
+
+def single_flight(
+	key: str,
+	fn: Callable[[], Any],
+	lock_ttl: int = 30,
+	wait_timeout: float = 15,
+	result_ttl: int = 30,
+) -> Any:
+	"""
+	Run fn once for all concurrent callers sharing a key
+
+	The first caller takes a Redis lock and runs fn; everyone else waits
+	(up to wait_timeout seconds) for the leader's JSON-serialisable result,
+	or re-raises the leader's error message.
+
+	Args:
+		key: Flight key, e.g. "token_refresh:<user>:<provider>"
+		fn: Zero-argument callable returning a JSON-serialisable value
+		lock_ttl: Lock expiry if the leader dies mid-flight
+		wait_timeout: Maximum seconds a follower waits for the result
+		result_ttl: Seconds the result stays readable for late followers
+
+	Returns:
+		fn's result
+	"""
+	deadline = time.monotonic() + wait_timeout
+
+	while True:
+		token = acquire_lock(key, lock_ttl)
+		if token:
+			return _lead(key, token, fn, result_ttl)
+
+		leader_token = frappe.cache().get(_lock_key(key))
+		if leader_token:
+			outcome = _wait_for_result(key, leader_token, deadline)
+			if outcome is not None:
+				return _unpack(outcome)
+
+		# Leader vanished without a result (or never existed): try to lead
+		if time.monotonic() >= deadline:
+			frappe.throw(
+				_("Timed out waiting for a concurrent request to finish"),
+				title=_("Request In Progress")
+			)
+
+
+def finish_flight(key: str, token: str, result: Any = None, error: Optional[str] = None, result_ttl: int = 30):
+	"""
+	Publish a flight's outcome to waiting callers and release its lock
+
+	Used by single_flight itself and by callers that took the lock with
+	acquire_lock (e.g. batch jobs) so followers still get a shared result.
+	"""
+	if error is None:
+		outcome = {"ok": True, "result": result}
+	else:
+		outcome = {"ok": False, "error": error}
+
+	# Publish before releasing so followers never see a free lock without a result
+	frappe.cache().set(_result_key(token), json.dumps(outcome, default=str), ex=result_ttl)
+	release_lock(key, token)
+
+
+def _lead(key: str, token: str, fn: Callable[[], Any], result_ttl: int) -> Any:
+	try:
+		result = fn()
+	except BaseException as e:
+		finish_flight(key, token, error=str(e) or e.__class__.__name__, result_ttl=result_ttl)
+		raise
+
+	finish_flight(key, token, result=result, result_ttl=result_ttl)
+	return result
+
+
+def _wait_for_result(key: str, leader_token, deadline: float):
+	"""Poll for the leader's outcome; None if the leader went away without one"""
+	cache = frappe.cache()
+	delay = 0.05
+
+	while True:
+		outcome = cache.get(_result_key(leader_token))
+		if outcome is not None:
+			return outcome
+
+		if cache.get(_lock_key(key)) != leader_token:
+			# Released or expired; the result may have landed in between
+			return cache.get(_result_key(leader_token))
+
+		if time.monotonic() >= deadline:
+			return None
+
+		time.sleep(delay)
+		delay = min(delay * 2, 0.5)
+
+
+def _unpack(outcome) -> Any:
+	outcome = json.loads(outcome)
+	if not outcome.get("ok"):
+		frappe.throw(outcome.get("error"))
+	return outcome.get("result")
+
+
+def _lock_key(key: str) -> str:
+	return frappe.cache().make_key(LOCK_PREFIX + key)
+
+
+def _result_key(token) -> str:
+	if isinstance(token, bytes):
+		token = token.decode()
+	return frappe.cache().make_key(RESULT_PREFIX + token)
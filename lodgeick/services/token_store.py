@@ -0,0 +1,108 @@
+"""
+OAuth Token Accessor
+Serves decrypted access tokens from process memory and Redis so hot paths
+skip both the Integration Token load and the password decryption
+"""
+
+import time
+from typing import Optional
+
+import frappe
+from frappe.utils import get_datetime, now_datetime
+from frappe.utils.password import get_decrypted_password
+
+
+CACHE_PREFIX = "lodgeick:access_token"
+
+# Stop serving a cached token this many seconds before it expires
+DEFAULT_SAFETY_MARGIN = 60
+# TTL for tokens without an expiry
+DEFAULT_TTL = 3600
+# Process-local copies are kept briefly; Redis is the shared source of truth
+DEFAULT_LOCAL_TTL = 10
+
+# (site, user, provider) -> (token info, monotonic deadline)
+_local_cache = {}
+
+
+def get_token(user: str, provider: str) -> Optional[frappe._dict]:
+	"""
+	Get a user's token for a provider
+
+	Args:
+		user: User
+		provider: Provider name
+
+	Returns:
+		frappe._dict with name, user, provider, access_token and expires_at,
+		or None if the user has not connected the provider
+	"""
+	local_key = (frappe.local.site, user, provider)
+	cached = _local_cache.get(local_key)
+	if cached and cached[1] > time.monotonic():
+		return cached[0]
+
+	token = frappe.cache().get_value(_cache_key(user, provider))
+	if token is None:
+		token = _load_token(user, provider)
+		if token is None:
+			return None
+
+		ttl = _cache_ttl(token.expires_at)
+		if ttl > 0:
+			frappe.cache().set_value(_cache_key(user, provider), token, expires_in_sec=ttl)
+	else:
+		ttl = _cache_ttl(token.expires_at)
+
+	local_ttl = min(ttl, frappe.conf.get("token_cache_local_ttl", DEFAULT_LOCAL_TTL))
+	if local_ttl > 0:
+		_local_cache[local_key] = (token, time.monotonic() + local_ttl)
+
+	return token
+
+
+def get_access_token(user: str, provider: str) -> Optional[str]:
+	"""Get a user's decrypted access token for a provider"""
+	token = get_token(user, provider)
+	return token.access_token if token else None
+
+
+def invalidate_token_cache(user: str, provider: str):
+	"""
+	Drop a cached token after it is refreshed, replaced or revoked
+
+	Other processes drop their local copy within token_cache_local_ttl seconds.
+	"""
+	frappe.cache().delete_value(_cache_key(user, provider))
+	_local_cache.pop((frappe.local.site, user, provider), None)
+
+
+def _load_token(user: str, provider: str) -> Optional[frappe._dict]:
+	token = frappe.db.get_value(
+		"Integration Token",
+		{"user": user, "provider": provider},
+		["name", "user", "provider", "expires_at"],
+		as_dict=True,
+		order_by="modified desc"
+	)
+	if not token:
+		return None
+
+	token.access_token = get_decrypted_password(
+		"Integration Token", token.name, "access_token", raise_exception=False
+	)
+	return token
+
+
+def _cache_ttl(expires_at) -> int:
+	"""Seconds a token may be cached: capped by its expiry minus the safety margin"""
+	ttl = frappe.conf.get("token_cache_ttl", DEFAULT_TTL)
+	if expires_at:
+		margin = frappe.conf.get("token_cache_safety_margin", DEFAULT_SAFETY_MARGIN)
+		remaining = (get_datetime(expires_at) - now_datetime()).total_seconds() - margin
+		ttl = min(ttl, int(remaining))
+	return ttl
+
+
+def _cache_key(user: str, provider: str) -> str:
+	return f"{CACHE_PREFIX}:{user}:{provider}"
@@ -0,0 +1,179 @@
+"""
+OAuth Usage History
+Per-minute request buckets for the last day (Redis, written by the rate
+limiter) and per-day buckets for a year (OAuth Usage Daily, rolled up by
+the usage flush job)
+
+Buckets are aligned to UTC minutes and days.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, getdate
+from pypika.terms import Values
+
+from lodgeick.services import rate_limiter
+
+
+GROUP_FIELDS = ("user", "provider", "tier", "api_name")
+DEFAULT_MINUTES = 60
+MAX_MINUTES = 1440
+DEFAULT_DAYS = 30
+
+
+def rollup_daily(limiters: List[Tuple[str, str, str, str]], now: Optional[float] = None) -> int:
+	"""
+	Write the day totals of the given limiters to OAuth Usage Daily
+
+	Totals are absolute, so rolling up the same limiters twice is harmless.
+	Yesterday is included so requests counted just before midnight UTC are
+	not lost when they are flushed after it.
+
+	Args:
+		limiters: (user, provider, tier, api_name) tuples counted since the last flush
+		now: Unix time to roll up for (default: current time)
+
+	Returns:
+		int: Rows written
+	"""
+	if not limiters:
+		return 0
+
+	now = now or time.time()
+	today = int(now // 86400) * 86400
+	members = [rate_limiter.MEMBER_SEPARATOR.join(limiter) for limiter in limiters]
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	for day_start in (today - 86400, today):
+		pipe.execute_command("HMGET", rate_limiter.history_key("day", day_start), *members)
+	totals = pipe.execute()
+
+	timestamp = datetime.now()
+	DailyUsage = frappe.qb.DocType("OAuth Usage Daily")
+	query = frappe.qb.into(DailyUsage).columns(
+		"name", "creation", "modified", "modified_by", "owner",
+		"usage_date", "user", "provider", "tier", "api_name", "requests"
+	)
+
+	rows = 0
+	for day_start, counts in zip((today - 86400, today), totals):
+		usage_date = datetime.fromtimestamp(day_start, timezone.utc).date()
+		for (user, provider, tier, api_name), count in zip(limiters, counts):
+			if count is None:
+				continue
+			query = query.insert(
+				frappe.generate_hash(length=10), timestamp, timestamp, "Administrator", "Administrator",
+				usage_date, user, provider, tier, api_name, int(count)
+			)
+			rows += 1
+
+	if rows:
+		query = query.on_duplicate_key_update(DailyUsage.requests, Values(DailyUsage.requests))
+		query = query.on_duplicate_key_update(DailyUsage.modified, Values(DailyUsage.modified))
+		query.run()
+
+	return rows
+
+
+@frappe.whitelist()
+def get_usage_history(
+	granularity: str = "day",
+	provider: str = None,
+	tier: str = None,
+	api_name: str = None,
+	user: str = None,
+	group_by=None,
+	from_date: str = None,
+	to_date: str = None,
+	minutes: int = DEFAULT_MINUTES,
+) -> List[Dict]:
+	"""
+	Aggregate OAuth request history for capacity planning
+
+	Args:
+		granularity: 'minute' (last day, from Redis) or 'day' (from OAuth Usage Daily)
+		provider: Optional provider filter
+		tier: Optional tier filter
+		api_name: Optional API filter
+		user: Optional user filter
+		group_by: Fields to break totals down by (list or comma-separated):
+			user, provider, tier, api_name
+		from_date: First day for 'day' (default: 30 days ago)
+		to_date: Last day for 'day' (default: today)
+		minutes: Minutes to return for 'minute' (default 60, max 1440)
+
+	Returns:
+		list: {"bucket", <group_by fields>, "requests"} ordered by bucket
+	"""
+	frappe.only_for("System Manager")
+
+	if isinstance(group_by, str):
+		group_by = [field.strip() for field in group_by.split(",") if field.strip()]
+	group_by = [field for field in GROUP_FIELDS if field in (group_by or [])]
+	filters = {"user": user, "provider": provider, "tier": tier, "api_name": api_name}
+
+	if granularity == "minute":
+		return _minute_history(filters, group_by, min(cint(minutes) or DEFAULT_MINUTES, MAX_MINUTES))
+	if granularity == "day":
+		return _daily_history(filters, group_by, from_date, to_date)
+
+	frappe.throw(frappe._("Granularity must be 'minute' or 'day'"))
+
+
+def _daily_history(filters: Dict, group_by: List[str], from_date: str, to_date: str) -> List[Dict]:
+	from frappe.query_builder.functions import Sum
+
+	to_date = getdate(to_date) if to_date else getdate()
+	from_date = getdate(from_date) if from_date else to_date - timedelta(days=DEFAULT_DAYS - 1)
+
+	DailyUsage = frappe.qb.DocType("OAuth Usage Daily")
+	group_columns = [DailyUsage[field] for field in group_by]
+	query = (
+		frappe.qb.from_(DailyUsage)
+		.select(DailyUsage.usage_date.as_("bucket"), *group_columns, Sum(DailyUsage.requests).as_("requests"))
+		.where(DailyUsage.usage_date.between(from_date, to_date))
+		.groupby(DailyUsage.usage_date, *group_columns)
+		.orderby(DailyUsage.usage_date)
+	)
+	for field, value in filters.items():
+		if value:
+			query = query.where(DailyUsage[field] == value)
+
+	return query.run(as_dict=True)
+
+
+def _minute_history(filters: Dict, group_by: List[str], minutes: int) -> List[Dict]:
+	current = int(time.time() // 60) * 60
+	buckets = [current - 60 * offset for offset in range(minutes - 1, -1, -1)]
+
+	pipe = frappe.cache().pipeline()
+	for bucket in buckets:
+		pipe.execute_command("HGETALL", rate_limiter.history_key("minute", bucket))
+	results = pipe.execute()
+
+	history = []
+	for bucket, raw in zip(buckets, results):
+		totals = {}
+		for member, count in _pairs(raw):
+			scope = dict(zip(GROUP_FIELDS, frappe.safe_decode(member).split(rate_limiter.MEMBER_SEPARATOR)))
+			if any(value and scope[field] != value for field, value in filters.items()):
+				continue
+			group = tuple(scope[field] for field in group_by)
+			totals[group] = totals.get(group, 0) + int(count)
+
+		bucket_time = datetime.fromtimestamp(bucket, timezone.utc).isoformat()
+		for group, requests in sorted(totals.items()):
+			history.append({"bucket": bucket_time, **dict(zip(group_by, group)), "requests": requests})
+
+	return history
+
+
+def _pairs(raw) -> List[Tuple]:
+	"""HGETALL replies arrive as a flat list or a dict depending on the client"""
+	if isinstance(raw, dict):
+		return list(raw.items())
+	return list(zip(raw[::2], raw[1::2]))
@@ -0,0 +1,91 @@
+"""
+Workflow Template Resolver
+Maps (source app, use case name) to the use case's workflow template,
+cached in Redis under the current catalog version so catalog changes
+invalidate it
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import frappe
+
+from lodgeick.services.catalog_cache import get_catalog_version
+
+
+CACHE_PREFIX = "lodgeick:workflow_templates"
+
+# Entries are keyed by version, so this only bounds memory for stale ones
+CACHE_TTL = 86400
+
+FIELD_SEPARATOR = "\x1f"
+
+# Cached for pairs with no template, so misses do not hit the database again
+NOT_FOUND = ""
+
+
+def resolve_workflow_template(source_app: str, use_case_name: str) -> Optional[str]:
+	"""Workflow template ID for one use case; see resolve_workflow_templates"""
+	return resolve_workflow_templates([(source_app, use_case_name)])[(source_app, use_case_name)]
+
+
+def resolve_workflow_templates(pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[str]]:
+	"""
+	Resolve many use cases at once
+
+	Cached pairs are read with one HMGET; the rest are loaded with one
+	indexed query on App Use Case (parent, use_case_name).
+
+	Args:
+		pairs: (source_app, use_case_name) tuples
+
+	Returns:
+		dict: pair -> workflow template ID, or None if the app has no such
+		use case (or it has no template)
+	"""
+	pairs = list(dict.fromkeys(pairs))
+	if not pairs:
+		return {}
+
+	cache = frappe.cache()
+	key = cache.make_key(f"{CACHE_PREFIX}:{get_catalog_version()}")
+	fields = [FIELD_SEPARATOR.join(pair) for pair in pairs]
+
+	resolved = {}
+	missing = []
+	for pair, value in zip(pairs, cache.execute_command("HMGET", key, *fields)):
+		if value is None:
+			missing.append(pair)
+		else:
+			resolved[pair] = frappe.safe_decode(value) or None
+
+	if missing:
+		loaded = _load_workflow_templates(missing)
+		pipeline = cache.pipeline()
+		for pair in missing:
+			template_id = loaded.get(pair)
+			resolved[pair] = template_id
+			pipeline.hset(key, FIELD_SEPARATOR.join(pair), template_id or NOT_FOUND)
+		pipeline.expire(key, CACHE_TTL)
+		pipeline.execute()
+
+	return resolved
+
+
+def _load_workflow_templates(pairs) -> Dict[Tuple[str, str], str]:
+	AppUseCase = frappe.qb.DocType("App Use Case")
+	rows = (
+		frappe.qb.from_(AppUseCase)
+		.select(AppUseCase.parent, AppUseCase.use_case_name, AppUseCase.workflow_template_id)
+		.where(
+			(AppUseCase.parenttype == "App Catalog")
+			& AppUseCase.parent.isin(list({app for app, _ in pairs}))
+			& AppUseCase.use_case_name.isin(list({name for _, name in pairs}))
+		)
+		.orderby(AppUseCase.idx)
+	).run()
+
+	templates = {}
+	for parent, use_case_name, template_id in rows:
+		# First matching row wins, as when scanning the app's use cases
+		templates.setdefault((parent, use_case_name), template_id)
+	return templates
@@ -0,0 +1,42 @@
+"""
+Deferred Request Release Job
+Releases rate-limited jobs parked by lodgeick.services.deferred_queue once
+their users' limits reopen
+"""
+
+import time
+
+from lodgeick.services import deferred_queue, metrics
+from lodgeick.services.single_flight import acquire_lock, release_lock
+
+
+# Cron jobs run on the default queue, so a run only keeps releasing for a
+# few seconds; jobs due later wait for the next scheduler tick
+RUN_SECONDS = 5
+MIN_SLEEP = 0.05
+LOCK_KEY = "deferred_release"
+
+
+def release_deferred_requests():
+	"""Scheduled job: release due deferred requests for up to RUN_SECONDS"""
+	if not deferred_queue.is_enabled():
+		return
+
+	token = acquire_lock(LOCK_KEY, ttl=RUN_SECONDS + 55)
+	if not token:
+		# Previous run is still releasing
+		return
+
+	try:
+		deadline = time.monotonic() + RUN_SECONDS
+		while True:
+			next_due = deferred_queue.release_due()
+			if next_due is None:
+				break
+			wait = max(next_due - time.time(), MIN_SLEEP)
+			if wait > deadline - time.monotonic():
+				break
+			time.sleep(wait)
+	finally:
+		release_lock(LOCK_KEY, token)
+		metrics.gauge("rate_limit.deferred_queue_depth", deferred_queue.queue_depth())
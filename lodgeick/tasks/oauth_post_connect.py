@@ -0,0 +1,125 @@
+"""
+Post-OAuth Connection Job
+Work that follows a successful OAuth callback, moved off the redirect path
+"""
+
+import json
+from datetime import datetime
+
+import frappe
+
+from lodgeick.services.realtime import publish_connection_progress
+
+
+def enqueue_post_connect(user, provider):
+	"""
+	Enqueue the post-connection work once the callback's transaction commits
+
+	Reconnecting again before the job runs reuses the queued job.
+	"""
+	frappe.enqueue(
+		"lodgeick.tasks.oauth_post_connect.finalize_oauth_connection",
+		queue="short",
+		timeout=300,
+		job_id=f"oauth_post_connect:{frappe.local.site}:{user}:{provider}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		user=user,
+		provider=provider
+	)
+
+
+def finalize_oauth_connection(user, provider):
+	"""
+	Materialise integration settings, push credentials to n8n and warm caches
+
+	Each step reports progress to the user over realtime; a failing step is
+	logged and reported but does not undo the stored token.
+
+	Args:
+		user: User who connected the provider
+		provider: Provider name
+	"""
+	errors = []
+
+	publish_connection_progress(user, provider, "settings")
+	try:
+		ensure_integration_settings(user, provider)
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		errors.append(str(e))
+		frappe.log_error(f"Failed to create User Integration Settings: {str(e)}", "OAuth Post Connect Error")
+
+	if frappe.conf.get("n8n_auto_sync", True):
+		publish_connection_progress(user, provider, "n8n")
+		try:
+			push_credentials_to_n8n(user, provider)
+		except Exception as e:
+			errors.append(str(e))
+			frappe.log_error(f"Failed to push {provider} credentials to n8n: {str(e)}", "OAuth Post Connect Error")
+
+	warm_connection_caches(user, provider)
+
+	if errors:
+		publish_connection_progress(user, provider, "error", "; ".join(errors))
+	else:
+		publish_connection_progress(user, provider, "done")
+
+	# Events are published after commit
+	frappe.db.commit()
+
+
+def ensure_integration_settings(user, provider):
+	"""Create or re-activate User Integration Settings for the app using this provider"""
+	app = frappe.db.get_value("App Catalog", {"oauth_provider": provider}, "name")
+	if not app:
+		return
+
+	existing_settings = frappe.db.get_value(
+		"User Integration Settings",
+		{"user": user, "app_name": app},
+		"name"
+	)
+
+	if existing_settings:
+		settings_doc = frappe.get_doc("User Integration Settings", existing_settings)
+		if not settings_doc.is_active:
+			settings_doc.is_active = 1
+			settings_doc.save(ignore_permissions=True)
+	else:
+		settings_doc = frappe.get_doc({
+			"doctype": "User Integration Settings",
+			"user": user,
+			"app_name": app,
+			"is_active": 1,
+			"settings": json.dumps({
+				"connected_at": datetime.now().isoformat(),
+				"provider": provider
+			})
+		})
+		settings_doc.insert(ignore_permissions=True)
+
+
+def push_credentials_to_n8n(user, provider):
+	"""Create or update the user's n8n credential from the stored token"""
+	token_doc = frappe.get_doc("Integration Token", {"user": user, "provider": provider})
+
+	token_data = token_doc.get_token_data_json()
+	token_data["access_token"] = token_doc.get_password("access_token", raise_exception=False)
+	token_data["refresh_token"] = token_doc.get_password("refresh_token", raise_exception=False)
+
+	from lodgeick.services.n8n_sync import get_n8n_sync_service
+	get_n8n_sync_service().sync_oauth_credentials(provider, user, token_data)
+
+
+def warm_connection_caches(user, provider):
+	"""Prime caches the first requests after connecting will hit"""
+	try:
+		from lodgeick.services.provider_config import get_provider_config_map
+		from lodgeick.services.token_store import get_token
+
+		get_provider_config_map()
+		get_token(user, provider)
+	except Exception as e:
+		frappe.log_error(f"Failed to warm caches after connecting {provider}: {str(e)}", "OAuth Post Connect Error")
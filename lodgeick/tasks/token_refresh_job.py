@@ -0,0 +1,245 @@
+"""
+Proactive Token Refresh Job
+Refreshes Integration Tokens shortly before they expire so workflows never
+run with an expired token
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from lodgeick.services import metrics
+
+
+DEFAULT_WINDOW_MINUTES = 15
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+
+# Failed refreshes are retried after 5, 10, 20... minutes (at most a day);
+# after max failures the token waits for the user to reconnect
+DEFAULT_MAX_FAILURES = 5
+FAILURE_BACKOFF_MINUTES = 5
+MAX_BACKOFF_MINUTES = 24 * 60
+
+
+def refresh_expiring_tokens():
+	"""
+	Scheduled job: refresh tokens whose expires_at falls inside the window
+
+	Site config:
+		token_refresh_window_minutes: How far ahead to refresh (default 15)
+		token_refresh_batch_size: Tokens per batch/commit (default 50)
+		token_refresh_concurrency: Parallel token requests per provider (default 4)
+		token_refresh_max_failures: Consecutive failures before a token is
+			left alone until reconnected (default 5)
+	"""
+	if not frappe.conf.get("token_refresh_enabled", True):
+		frappe.logger().info("Proactive token refresh is disabled, skipping job")
+		return
+
+	window = cint(frappe.conf.get("token_refresh_window_minutes")) or DEFAULT_WINDOW_MINUTES
+	batch_size = cint(frappe.conf.get("token_refresh_batch_size")) or DEFAULT_BATCH_SIZE
+	concurrency = cint(frappe.conf.get("token_refresh_concurrency")) or DEFAULT_CONCURRENCY
+	max_failures = cint(frappe.conf.get("token_refresh_max_failures")) or DEFAULT_MAX_FAILURES
+
+	started = time.monotonic()
+	now = now_datetime()
+	tokens = frappe.get_all(
+		"Integration Token",
+		filters={
+			"expires_at": ["<=", now + timedelta(minutes=window)],
+			"refresh_token": ["is", "set"],
+			"refresh_failures": ["<", max_failures]
+		},
+		or_filters=[
+			["next_refresh_attempt", "is", "not set"],
+			["next_refresh_attempt", "<=", now]
+		],
+		fields=["name", "user", "provider", "expires_at"],
+		order_by="expires_at asc"
+	)
+
+	by_provider = {}
+	for token in tokens:
+		by_provider.setdefault(token.provider, []).append(token)
+
+	summary = {"refreshed": 0, "failed": 0, "skipped": 0}
+
+	for provider, provider_tokens in by_provider.items():
+		for start in range(0, len(provider_tokens), batch_size):
+			batch = provider_tokens[start:start + batch_size]
+			result = refresh_token_batch(provider, [t.name for t in batch], concurrency)
+			for key in summary:
+				summary[key] += result[key]
+
+	metrics.gauge("token_refresh.due", len(tokens))
+	metrics.observe("token_refresh.job_ms", (time.monotonic() - started) * 1000)
+
+	frappe.logger().info(
+		f"Token refresh job completed: {summary['refreshed']} refreshed, "
+		f"{summary['failed']} failed, {summary['skipped']} skipped"
+	)
+
+	return {"success": True, **summary}
+
+
+def refresh_token_batch(provider, token_names, concurrency=DEFAULT_CONCURRENCY):
+	"""
+	Refresh a batch of one provider's tokens
+
+	Token endpoint calls run in a bounded thread pool; documents are loaded,
+	saved and synced to n8n on the job's own thread and committed once per
+	batch.
+
+	Args:
+		provider: Provider name
+		token_names: Integration Token names
+		concurrency: Maximum parallel requests to the provider
+
+	Returns:
+		dict: refreshed/failed/skipped counts
+	"""
+	from lodgeick.api.oauth import (
+		build_refresh_request,
+		get_provider_config,
+		store_refreshed_tokens,
+		token_refresh_flight_key,
+		token_refresh_lock_ttl
+	)
+	from lodgeick.services.provider_http import get_timeout, record_token_request
+	from lodgeick.services.single_flight import acquire_lock, finish_flight
+
+	result = {"refreshed": 0, "failed": 0, "skipped": 0}
+	tags = {"provider": provider}
+
+	provider_config = get_provider_config(provider)
+	if not provider_config or not provider_config.get("client_id") or not provider_config.get("client_secret"):
+		result["skipped"] = len(token_names)
+		metrics.increment("token_refresh.skipped", len(token_names), tags)
+		return result
+
+	# Locks are held until the whole batch is done
+	lock_ttl = token_refresh_lock_ttl(math.ceil(len(token_names) / max(1, concurrency)))
+	token_url = provider_config["token_url"]
+	timeout = get_timeout(frappe.conf.get("oauth_http_timeout"))
+
+	token_docs = []
+	requests_data = []
+	locks = []
+	outcomes = []
+	try:
+		for name in token_names:
+			token_doc = frappe.get_doc("Integration Token", name)
+			refresh_token_value = token_doc.get_password("refresh_token", raise_exception=False)
+			if not refresh_token_value:
+				result["skipped"] += 1
+				continue
+
+			# An on-demand refresh for this token is already in flight
+			flight_key = token_refresh_flight_key(token_doc.user, provider)
+			lock = acquire_lock(flight_key, ttl=lock_ttl)
+			if not lock:
+				result["skipped"] += 1
+				continue
+
+			locks.append((flight_key, lock))
+			token_docs.append(token_doc)
+			requests_data.append(build_refresh_request(provider_config, refresh_token_value))
+
+		with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+			futures = [
+				executor.submit(_timed_token_request, provider, token_url, data, timeout)
+				for data in requests_data
+			]
+
+		for token_doc, future in zip(token_docs, futures):
+			try:
+				response, error, elapsed_ms = future.result()
+				record_token_request(provider, elapsed_ms, response=response, error=error)
+				if error is not None:
+					raise error
+				if response.status_code != 200:
+					raise Exception(f"HTTP {response.status_code}: {response.text[:500]}")
+
+				tokens = response.json()
+				store_refreshed_tokens(token_doc, tokens)
+				push_token_to_n8n(token_doc, tokens)
+				result["refreshed"] += 1
+				outcomes.append(None)
+
+			except Exception as e:
+				result["failed"] += 1
+				outcomes.append(f"Failed to refresh token: {str(e)}")
+				record_refresh_failure(token_doc)
+				frappe.log_error(
+					f"Failed to refresh {provider} token {token_doc.name} for {token_doc.user}: {str(e)}",
+					"Token Refresh Job Error"
+				)
+
+		frappe.db.commit()
+
+	finally:
+		# Hand the outcome to any on-demand refresh that queued up behind us
+		for index, (flight_key, lock) in enumerate(locks):
+			error = outcomes[index] if index < len(outcomes) else "Token refresh was interrupted"
+			finish_flight(
+				flight_key,
+				lock,
+				result={"success": True, "message": "Token refreshed successfully"} if error is None else None,
+				error=error
+			)
+
+	metrics.increment("token_refresh.refreshed", result["refreshed"], tags)
+	metrics.increment("token_refresh.failed", result["failed"], tags)
+	if result["skipped"]:
+		metrics.increment("token_refresh.skipped", result["skipped"], tags)
+
+	return result
+
+
+def record_refresh_failure(token_doc):
+	"""Count a failed background refresh and back off before the next attempt"""
+	failures = cint(token_doc.refresh_failures) + 1
+	delay = min(FAILURE_BACKOFF_MINUTES * 2 ** (failures - 1), MAX_BACKOFF_MINUTES)
+	frappe.db.set_value(
+		"Integration Token",
+		token_doc.name,
+		{
+			"refresh_failures": failures,
+			"next_refresh_attempt": now_datetime() + timedelta(minutes=delay)
+		},
+		update_modified=False
+	)
+
+
+def _timed_token_request(provider, token_url, data, timeout):
+	"""Thread pool worker: returns (response, error, elapsed_ms) without touching frappe"""
+	from lodgeick.services.provider_http import post_token_request
+
+	started = time.monotonic()
+	try:
+		response = post_token_request(provider, token_url, data, timeout)
+		return response, None, (time.monotonic() - started) * 1000
+	except Exception as e:
+		return None, e, (time.monotonic() - started) * 1000
+
+
+def push_token_to_n8n(token_doc, tokens):
+	"""Update the user's n8n credential with a freshly refreshed token"""
+	if not frappe.conf.get("n8n_auto_sync", True):
+		return
+
+	token_data = dict(tokens)
+	if not token_data.get("refresh_token"):
+		token_data["refresh_token"] = token_doc.get_password("refresh_token", raise_exception=False)
+
+	try:
+		from lodgeick.services.n8n_sync import get_n8n_sync_service
+		get_n8n_sync_service().sync_oauth_credentials(token_doc.provider, token_doc.user, token_data)
+	except Exception as e:
+		# The token itself was refreshed; n8n will be retried on the next refresh
+		frappe.log_error(f"Failed to push refreshed token to n8n: {str(e)}", "Token Refresh Job Error")
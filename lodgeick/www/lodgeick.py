@@ -1,6 +1,8 @@
 import frappe
 from frappe.utils import cstr
 
+from lodgeick.services.catalog_snapshot import get_snapshot_url
+
 # Allow guest access to the landing page
 no_cache = 1
 
@@ -15,6 +17,8 @@ def get_context(context):
 			"csrf_token": frappe.session.data.csrf_token if frappe.session.data else "",
 		},
 		"sitename": frappe.local.site,
+		# Prebuilt catalog served as a static asset (see catalog_snapshot)
+		"catalog_snapshot": get_snapshot_url(),
 	})
 	context.no_cache = 1
 	return context